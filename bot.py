@@ -1,28 +1,80 @@
 import records
 import config
+from cache import GuildIndex, LRUCache
+from jobs import JobWorker
+from scheduler import TimerScheduler
+from loop_monitor import LoopMonitor
+from supervisor import beat_forever
+from ratelimit import KeyedRateLimiter, TokenBucket
+import metrics
 
 import discord
 from discord.ext import commands
 from discord import app_commands
 import asyncio
+import logging
 import random
+import signal
 import smtplib
+import sys
+import time
 from email.mime.text import MIMEText
 
-from typing import cast
+try:
+    import resource # Not available on Windows
+except ImportError:
+    resource = None
+
+import log_setup
+
+_process_start = time.perf_counter()
+logger = logging.getLogger(__name__)
 
 #Init Bot Settings
 intents = discord.Intents.default()
 intents.message_content = True
 intents.members = True
 
-bot = commands.Bot(command_prefix='!', intents=intents)
+class TimedCommandTree(app_commands.CommandTree):
+    """ Command tree that times every slash command (see metrics.py). """
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.type == discord.InteractionType.application_command and interaction.command:
+            interaction.extras['timing'] = metrics.start_timing(interaction.command.qualified_name)
+        return True
+
+    async def on_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
+        record_command_timing(interaction, "error")
+        await super().on_error(interaction, error)
+
+# Lean mode skips downloading and caching every member, which is slow and memory hungry on a
+# large guild. Members are then looked up on demand with fetch_member() instead.
+member_cache_options = {}
+if config.discord_lean_member_cache:
+    member_cache_options = {'member_cache_flags': discord.MemberCacheFlags.none(), 'chunk_guilds_at_startup': False}
+
+bot = commands.Bot(command_prefix='!', intents=intents, tree_cls=TimedCommandTree, **member_cache_options)
 
 #---------------------Constants----------------------
 
 MAX_TEAM_SIZE = 4
 CAPSTONE_TEAM_SIZE = 5
-TEAM_FORMATION_TIMEOUT = 120
+MIN_TEAM_SIZE = 2
+TEAM_FORMATION_TIMEOUT = 120 # Seconds a team may stay smaller than MIN_TEAM_SIZE before it is removed
+TEARDOWN_CONCURRENCY = 10
+LOOP_LAG_THRESHOLD = 0.25 # Seconds the event loop can be blocked before it is reported as a stall
+METRICS_WRITE_INTERVAL = 15 # Seconds between writes of metrics.BOT_METRICS_FILE for web.py to serve
+MEMBER_LRU_SIZE = 512 # Members fetched from the API that are kept when discord.py's member cache is off
+MEMBER_LRU_TTL = 300  # Seconds a fetched member is trusted before it is fetched again
+RESYNC_CONCURRENCY = 5
+JOB_TEARDOWN_BATCH = 25 # Teams torn down between job checkpoints
+JOB_PROGRESS_INTERVAL = 5 # Seconds between job progress checkpoints
+ROLE_CHANGE_INTERVAL = 2 # Seconds between checks for role changes made by web.py or the import scripts
+
+# Verification email limits, as (emails allowed in a burst, seconds to earn back one email)
+VERIFY_EMAILS_PER_USER = (3, 120)  # Per Discord account
+VERIFY_EMAILS_PER_EMAIL = (3, 120) # Per registered email address
+VERIFY_EMAILS_GLOBAL = (30, 1)     # Across everyone, to stay under the mail provider's limits
 
 # Maps role names to corresponding role IDs from configuration
 role_map = {
@@ -33,6 +85,36 @@ role_map = {
     "all-access": config.discord_all_access_pass_role_id
 }
 
+# Roles and channels the bot looks up on every command, loaded into guild_index on startup
+index_role_map = {
+    **role_map,
+    "team-assigned": config.discord_team_assigned_role_id,
+    "organizer": config.discord_organizer_role_id
+}
+index_channel_map = {
+    "start-here": config.discord_start_here_channel_id,
+    "ask-an-organizer": config.discord_ask_an_organizer_channel_id
+}
+
+guild_index = GuildIndex()
+member_lru = LRUCache(MEMBER_LRU_SIZE, MEMBER_LRU_TTL)
+
+verify_user_limiter = KeyedRateLimiter(1 / VERIFY_EMAILS_PER_USER[1], VERIFY_EMAILS_PER_USER[0])
+verify_email_limiter = KeyedRateLimiter(1 / VERIFY_EMAILS_PER_EMAIL[1], VERIFY_EMAILS_PER_EMAIL[0])
+verify_global_limiter = TokenBucket(1 / VERIFY_EMAILS_GLOBAL[1], VERIFY_EMAILS_GLOBAL[0])
+loop_monitor = LoopMonitor(threshold=LOOP_LAG_THRESHOLD)
+job_worker = JobWorker()
+timer_scheduler = TimerScheduler()
+heartbeat = None # Set by start() when run under start.py's supervisor
+background_tasks = [] # Strong references, so the event loop can't garbage collect running tasks
+
+# Slash command latency, broken down by where the time went
+bot_metrics = metrics.Registry()
+command_duration = bot_metrics.histogram("bot_command_duration_seconds", "Total time spent handling a slash command", ("command", "status"))
+command_defer = bot_metrics.histogram("bot_command_defer_seconds", "Time until a slash command was first acknowledged", ("command",))
+command_db = bot_metrics.histogram("bot_command_db_seconds", "Time a slash command spent in records.py", ("command",))
+command_api = bot_metrics.histogram("bot_command_api_seconds", "Time a slash command spent waiting on Discord API requests (summed)", ("command",))
+
 # --------------------Helper Methods-------------------
 OHIO_RED = discord.Color.from_rgb(186, 12, 47)
 def create_embed(title: str, description: str, color=OHIO_RED) -> discord.Embed:
@@ -43,6 +125,99 @@ def create_embed(title: str, description: str, color=OHIO_RED) -> discord.Embed:
     embed = discord.Embed(title=title, description=description, color=color)
     return embed
 
+def record_command_timing(interaction: discord.Interaction, status: str):
+    """ Adds a finished slash command's timing to the latency histograms. """
+    timing = interaction.extras.pop('timing', None)
+    if not timing: return
+
+    command_duration.observe(timing.elapsed(), timing.name, status)
+    if timing.defer is not None: command_defer.observe(timing.defer, timing.name)
+    command_db.observe(timing.totals['db'], timing.name)
+    command_api.observe(timing.totals['api'], timing.name)
+
+async def write_metrics():
+    """ Periodically writes the bot's metrics to a file for web.py's /metrics endpoint. """
+    while True:
+        await asyncio.sleep(METRICS_WRITE_INTERVAL)
+        try:
+            await asyncio.to_thread(bot_metrics.write_textfile, metrics.BOT_METRICS_FILE)
+        except OSError as e:
+            logger.error(f"Could not write metrics: {e}")
+
+def peak_memory_mb() -> float:
+    """ Returns the process's peak resident memory (RSS) in MB, or None if it can't be measured (Windows). """
+    if resource is None: return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / (1024 if sys.platform == 'darwin' else 1) # bytes on macOS, KB elsewhere
+
+async def fetch_member(guild: discord.Guild, discord_id: int) -> discord.Member:
+    """
+    Returns a member of the guild, or None if they aren't in the server.
+    Members missing from discord.py's cache (all of them in lean mode) are fetched from the
+    API and kept in member_lru for a while.
+    """
+    member = guild.get_member(discord_id)
+    if member: return member
+    if discord_id in member_lru: return member_lru.get(discord_id)
+
+    try:
+        member = await guild.fetch_member(discord_id)
+    except discord.NotFound:
+        member = None
+    member_lru.put(discord_id, member)
+    return member
+
+async def iter_members(guild: discord.Guild):
+    """ Yields every member of the guild, from the member cache if it holds everyone and from the API otherwise. """
+    if guild.chunked:
+        for member in guild.members:
+            yield member
+    else:
+        async for member in guild.fetch_members(limit=None):
+            yield member
+
+async def watch_role_changes():
+    """
+    Consumes the role_changes table, which a database trigger fills whenever a registration's
+    roles change (e.g. a web.py upsert), and re-syncs just those members' roles.
+    """
+    while True:
+        await asyncio.sleep(ROLE_CHANGE_INTERVAL)
+        try:
+            await process_role_changes()
+        except Exception as e:
+            # Keep watching; the changes stay queued and are retried next time
+            logger.exception(f"Could not process role changes: {e}")
+
+async def process_role_changes():
+    """ Re-syncs the members named in the next batch of role changes, then removes the batch. """
+    changes = records.get_role_changes()
+    if not changes: return
+
+    guild = bot.get_guild(config.discord_guild_id)
+    if not guild:
+        logger.warning("Guild unavailable, leaving role changes queued")
+        return
+    for email in dict.fromkeys(change['email'] for change in changes):
+        user = records.get_verified_user(email)
+        if not user or not user['discord_id']: continue
+        # A cached member's roles can be minutes old, so diff against freshly fetched ones.
+        # Syncing doesn't update the fetched member's roles either, so drop it again afterwards.
+        member_lru.pop(user['discord_id'])
+        try:
+            member = await fetch_member(guild, user['discord_id'])
+            if member: await sync_user_roles(member)
+        except discord.HTTPException as e:
+            logger.error(f"Could not sync roles after a registration change: {e}", extra={'fields': {'email': email}})
+        member_lru.pop(user['discord_id'])
+    records.remove_role_changes(changes[-1]['id'])
+
+def refund_verify_limits(discord_id: int, email: str):
+    """ Gives back the rate limit tokens taken for a verification email that failed to send. """
+    verify_user_limiter.refund(discord_id)
+    verify_email_limiter.refund(email)
+    verify_global_limiter.refund()
+
 def generate_random_code(n): # TESTED
     """
     Generates random string of specified length using uppercase letters, lowercase letters, and digits.
@@ -59,20 +234,19 @@ def generate_random_code(n): # TESTED
     characters = '0123456789'
     return ''.join(random.choices(characters, k=n))    
 
-async def sync_user_roles(member: discord.Member): # TESTED
+def get_role_diff(member: discord.Member, db_roles: list) -> tuple:
     """
-    Full Sync: 
-    1. Looks at every role defined in role_map.
-    2. Adds it if the DB says they should have it.
-    3. Removes it if the DB says they shouldn't (and they currently do).
+    Compares a member's current roles with the roles their registration says they should have.
+    Only roles defined in role_map are considered.
+
+    Args:
+        member (discord.Member): The member to check.
+        db_roles (list): Role names from the registration table, e.g. ['participant', 'mentor'].
+
+    Returns:
+        tuple: (roles_to_add, roles_to_remove) as lists of discord.Role
     """
-    
-    # Check that memeber is verified and capable of having roles assinged
-    if not records.is_verified(member.id): return
-    
-    # Get the list of roles the user SHOULD have from the DB
-    email = records.get_verified_email(member.id)
-    should_have_names = records.get_user_roles(email)
+    should_have_names = list(db_roles)
     should_have_names.append("verified") # Always verified
 
     # All-Access-Pass if mentor or judge
@@ -83,9 +257,9 @@ async def sync_user_roles(member: discord.Member): # TESTED
     roles_to_remove = []
 
     # Iterate through the roles we manage (role_map)
-    for role_name, role_id in role_map.items():
+    for role_name in role_map:
         
-        discord_role = member.guild.get_role(role_id)
+        discord_role = guild_index.role(role_name)
         if not discord_role: continue
             
         # Check if user has this role currently
@@ -100,35 +274,228 @@ async def sync_user_roles(member: discord.Member): # TESTED
         elif not should_have and has_role:
             roles_to_remove.append(discord_role)
 
+    return roles_to_add, roles_to_remove
+
+async def sync_user_roles(member: discord.Member): # TESTED
+    """
+    Full Sync: 
+    1. Looks at every role defined in role_map.
+    2. Adds it if the DB says they should have it.
+    3. Removes it if the DB says they shouldn't (and they currently do).
+    """
+    
+    # Check that memeber is verified and capable of having roles assinged
+    if not records.is_verified(member.id): return
+    
+    # Get the list of roles the user SHOULD have from the DB
+    email = records.get_verified_email(member.id)
+    roles_to_add, roles_to_remove = get_role_diff(member, records.get_user_roles(email))
+
     # 3. Apply Changes (Bulk operations are faster/safer)
     if roles_to_add: await member.add_roles(*roles_to_add)
     if roles_to_remove: await member.remove_roles(*roles_to_remove)
 
-async def handle_team_deletion(team_id: int): # TESTED
+async def handle_team_deletion(*team_ids: int): # TESTED
     """
-    Handles the timeout of team formation when team doesn't meet minimum size requirement
+    Tears down one or more teams, e.g. when team formation times out or at the end of the event.
     
-    If team has fewer than two members when timeout, this function will:
-        1. remove team assigned role from all current members of team.
-        2. remove team association from members in database
-        3. delete team associated channels
-        4. sends message explaining timeout and team re-creation process
+    For all of the given teams at once, this function will:
+        1. remove team association from every member in a single database transaction
+        2. remove the team assigned role from all members
+        3. delete each team's role (which takes it off its members) and channels
+
+    Discord requests run concurrently, at most TEARDOWN_CONCURRENCY at a time.
 
     Args:
-        ctxt (discord.Interaction): The Context of the Interaction.
-        team_id (int): The unique ID of the team
+        team_ids (int): The unique IDs of the teams to delete
     """
     guild = bot.get_guild(config.discord_guild_id)
-    if records.team_exists(team_id):
-
-        # Remove Role and team_id from each user on team
-        for member in records.get_team_members(team_id):
-            await perform_team_leave(guild.get_member(member['discord_id']), team_id)
-            
-        # Remove all Channels
-        await delete_team_channels(team_id)
-        records.remove_team(team_id)
+    teams = {team_id: guild_index.team(team_id) for team_id in team_ids if guild_index.team(team_id)}
+    if not teams: return
+
+    # Remove team_id from every user and delete the teams
+    members_by_team = records.remove_teams(list(teams))
+    for team_id in teams:
+        guild_index.remove_team(team_id)
+
+    semaphore = asyncio.Semaphore(TEARDOWN_CONCURRENCY)
+    async def limited(coro):
+        async with semaphore:
+            return await coro
+
+    async def remove_assigned_role(discord_id, role):
+        member = await fetch_member(guild, discord_id)
+        if member: await member.remove_roles(role)
+
+    # Deleting a team role removes it from members, so only the shared role is removed per member
+    requests = []
+    a_role = guild_index.role("team-assigned")
+    for team_id, member_ids in members_by_team.items():
+        if a_role: requests += [remove_assigned_role(discord_id, a_role) for discord_id in member_ids]
+    for team_id in members_by_team:
+        requests += delete_team_channels(teams[team_id])
+
+    for result in await asyncio.gather(*(limited(request) for request in requests), return_exceptions=True):
+        if isinstance(result, Exception):
+            logger.error(f"Part of a team teardown failed: {result}")
         
+async def get_role_changes(guild: discord.Guild) -> tuple:
+    """
+    Works out which verified members' roles differ from the database.
+
+    Returns:
+        tuple: ([(member, roles_to_add, roles_to_remove), ...], summary text for an embed)
+    """
+    roles_by_id = records.get_all_verified_roles()
+    members = [member async for member in iter_members(guild)]
+    changes = []
+    added_counts = {}
+    removed_counts = {}
+    for member in members:
+        if member.id not in roles_by_id: continue
+
+        roles_to_add, roles_to_remove = get_role_diff(member, roles_by_id[member.id])
+        if not roles_to_add and not roles_to_remove: continue
+
+        changes.append((member, roles_to_add, roles_to_remove))
+        for role in roles_to_add: added_counts[role.name] = added_counts.get(role.name, 0) + 1
+        for role in roles_to_remove: removed_counts[role.name] = removed_counts.get(role.name, 0) + 1
+
+    not_in_server = len(roles_by_id.keys() - {member.id for member in members})
+    summary = f"**Verified users:** {len(roles_by_id)} ({not_in_server} not in the server)\n**Members needing changes:** {len(changes)}"
+    if added_counts:
+        summary += "\n**Roles to add:** " + ", ".join(f"`{name}` x{count}" for name, count in added_counts.items())
+    if removed_counts:
+        summary += "\n**Roles to remove:** " + ", ".join(f"`{name}` x{count}" for name, count in removed_counts.items())
+    return changes, summary
+
+# ---------------------Background Jobs---------------------
+# Each handler runs one kind of job queued with job_worker.enqueue() (see jobs.py) and
+# returns a summary. job.checkpoint is None on the first run, or the value last saved
+# with job.save_progress() when resuming after a restart.
+
+async def broadcast_job(job) -> str:
+    """ Sends payload['message'] to each team in payload['team_ids']. Checkpoint: {'next': index, 'failed': count} """
+    team_ids = job.payload['team_ids']
+    checkpoint = job.checkpoint or {'next': 0, 'failed': 0}
+
+    for i in range(checkpoint['next'], len(team_ids)):
+        team = guild_index.team(team_ids[i])
+        if team and team['role'] and team['text']:
+            try:
+                await team['text'].send(embed=create_embed(title="📫 Broadcasted Message", description=job.payload['message']))
+            except Exception as e:
+                checkpoint['failed'] += 1
+                logger.error(f"Failed to send message to {team['text'].name}: {e}")
+        checkpoint['next'] = i + 1
+        job.save_progress(i + 1, len(team_ids), checkpoint)
+
+    return f"Broadcast sent to {len(team_ids) - checkpoint['failed']}/{len(team_ids)} team channels."
+
+async def delete_teams_job(job) -> str:
+    """ Tears down the teams in payload['team_ids'], JOB_TEARDOWN_BATCH at a time. Checkpoint: index of the next batch """
+    team_ids = job.payload['team_ids']
+    for i in range(job.checkpoint or 0, len(team_ids), JOB_TEARDOWN_BATCH):
+        await handle_team_deletion(*team_ids[i:i + JOB_TEARDOWN_BATCH])
+        done = min(i + JOB_TEARDOWN_BATCH, len(team_ids))
+        job.save_progress(done, len(team_ids), done)
+
+    # New teams keep filling the latest shared category, so the categories are only removed once every team is gone
+    if config.discord_shared_categories and not guild_index.teams:
+        guild = bot.get_guild(config.discord_guild_id)
+        categories = [guild.get_channel(category_id) for category_id in records.remove_all_categories()]
+        for result in await asyncio.gather(*(category.delete() for category in categories if category), return_exceptions=True):
+            if isinstance(result, Exception):
+                logger.error(f"Could not delete a shared team category: {result}")
+    return f"Removed {len(team_ids)} teams."
+
+async def resync_job(job) -> str:
+    """
+    Applies get_role_changes() to every member. Applying a change makes it disappear from the
+    next diff, so a resumed job simply recomputes it. Checkpoint: {'done': count, 'failed': count}
+    """
+    guild = bot.get_guild(config.discord_guild_id)
+    changes, summary = await get_role_changes(guild)
+    checkpoint = job.checkpoint or {'done': 0, 'failed': 0}
+    total = checkpoint['done'] + len(changes)
+    job.save_progress(checkpoint['done'], total, checkpoint)
+
+    semaphore = asyncio.Semaphore(RESYNC_CONCURRENCY)
+    last_save = asyncio.get_running_loop().time()
+
+    async def apply_change(member, roles_to_add, roles_to_remove):
+        nonlocal last_save
+        async with semaphore:
+            try:
+                if roles_to_add: await member.add_roles(*roles_to_add, reason="/resync_all")
+                if roles_to_remove: await member.remove_roles(*roles_to_remove, reason="/resync_all")
+            except discord.HTTPException as e:
+                checkpoint['failed'] += 1
+                logger.error(f"Could not resync roles for {member.name}: {e}")
+            checkpoint['done'] += 1
+
+            now = asyncio.get_running_loop().time()
+            if now - last_save >= JOB_PROGRESS_INTERVAL:
+                last_save = now
+                job.save_progress(checkpoint['done'], total, checkpoint)
+
+    await asyncio.gather(*(apply_change(*change) for change in changes))
+    job.save_progress(checkpoint['done'], total, checkpoint)
+    return f"{checkpoint['done'] - checkpoint['failed']}/{total} members updated, {checkpoint['failed']} failed."
+
+async def notify_job_finished(job, status: str, result: str):
+    """ Lets the organizer who queued a job know that it has finished. """
+    if not job.created_by: return
+    user = bot.get_user(job.created_by) or await bot.fetch_user(job.created_by)
+    icon = "✅" if status == 'done' else "❌"
+    await user.send(content=f"{icon} Job #{job.id} ({job.kind}) {'finished' if status == 'done' else 'failed'}: {result}")
+
+job_worker.register("broadcast", broadcast_job)
+job_worker.register("delete_teams", delete_teams_job)
+job_worker.register("resync", resync_job)
+job_worker.on_finish = notify_job_finished
+
+# -------------------------Timers--------------------------
+# Each handler fires one kind of timer scheduled with timer_scheduler.schedule() (see scheduler.py)
+
+async def code_expiry_timer(payload: dict):
+    """ Deletes an expired verification code. """
+    records.remove_code(payload['code'])
+
+def schedule_code_expiry(code: str):
+    """ Deletes the verification code once it expires, replacing any earlier expiry timer for it. """
+    timer_scheduler.schedule("code_expiry", {'code': code}, config.email_code_expiration_time, key=f"code_expiry:{code}")
+
+async def team_formation_timer(payload: dict):
+    """ Removes a team that is still smaller than MIN_TEAM_SIZE when its deadline passes, and tells its members. """
+    team_id = payload['team_id']
+    team = guild_index.team(team_id)
+    if not team or records.get_team_size(team_id) >= MIN_TEAM_SIZE: return
+
+    members = records.get_team_members(team_id)
+    await handle_team_deletion(team_id)
+
+    guild = bot.get_guild(config.discord_guild_id)
+    for member in members:
+        discord_member = await fetch_member(guild, member['discord_id'])
+        if not discord_member: continue
+        try:
+            await discord_member.send(content=f"Your team `<{team['name']}>` has been removed because it had fewer than {MIN_TEAM_SIZE} members for {round(TEAM_FORMATION_TIMEOUT / 60)} minutes. You may create a new team with `/create_team`.")
+        except discord.HTTPException as e:
+            logger.error(f"Could not tell {discord_member.name} their team was removed: {e}")
+
+async def announcement_timer(payload: dict):
+    """ Posts a scheduled announcement to its channel, or queues a broadcast to every team if it has none. """
+    if payload['channel_id']:
+        channel = bot.get_channel(payload['channel_id'])
+        if channel: await channel.send(embed=create_embed(title="📢 Announcement", description=payload['message']))
+    else:
+        job_worker.enqueue("broadcast", {'message': payload['message'], 'team_ids': list(guild_index.teams)}, payload['created_by'])
+
+timer_scheduler.register("code_expiry", code_expiry_timer)
+timer_scheduler.register("team_formation", team_formation_timer)
+timer_scheduler.register("announcement", announcement_timer)
+
 async def send_verification_email(recipient, CODE, username): # TESTED
     """
     Sends verification email to recipient with one-time use link for verifying Discord account
@@ -159,35 +526,131 @@ async def send_verification_email(recipient, CODE, username): # TESTED
     msg['From'] = config.email_address
     msg['To'] = recipient
     try:
-        with smtplib.SMTP_SSL('smtp.gmail.com', 465) as smtp_server:
-            smtp_server.login(config.email_address, config.email_password)
-            smtp_server.sendmail(config.email_address, recipient, msg.as_string())
+        # smtplib blocks, so send from a worker thread instead of stalling the event loop
+        await asyncio.to_thread(_send_email, recipient, msg)
         return True
     except Exception as e:
-        print(f"ERROR: Message not to {recipient} not sent. ERROR: {e}")
+        logger.error(f"Verification email to {recipient} not sent: {e}")
         return False
 
-async def delete_team_channels(team_id: int): # TESTED
+def _send_email(recipient: str, msg: MIMEText):
+    smtp_class = smtplib.SMTP_SSL if config.email_smtp_ssl else smtplib.SMTP
+    with smtp_class(config.email_smtp_host, config.email_smtp_port) as smtp_server:
+        smtp_server.login(config.email_address, config.email_password)
+        smtp_server.sendmail(config.email_address, recipient, msg.as_string())
 
-    # Get all channels and role from database
-    guild = bot.get_guild(config.discord_guild_id)
-    team_data = records.get_team(team_id)
+def delete_team_channels(team_data: dict) -> list:
+    """ Returns the (not yet awaited) requests that delete a team's channels and role. """
 
-    category_id = team_data['category_id']
-    text_id = team_data['text_id']
-    voice_id = team_data['voice_id']
-    role_id = team_data['role_id']
-    
-    category = guild.get_channel(category_id) if category_id else None
-    text = guild.get_channel(text_id) if text_id else None
-    voice = guild.get_channel(voice_id) if voice_id else None
-    role = guild.get_role(role_id) if role_id else None
+    category = team_data['category']
+    text = team_data['text']
+    voice = team_data['voice']
+    role = team_data['role']
+
+    requests = []
+    if text: requests.append(text.delete())
+    if voice: requests.append(voice.delete())
+    if role: requests.append(role.delete())
+    if category and not config.discord_shared_categories: requests.append(category.delete())
+    return requests
+
+
+def _team_id_column(obj) -> str:
+    """ Returns the teams table column that holds the ID of a team's role or channel. """
+    if isinstance(obj, discord.Role): return 'role_id'
+    if isinstance(obj, discord.CategoryChannel): return 'category_id'
+    if isinstance(obj, discord.VoiceChannel): return 'voice_id'
+    return 'text_id'
+
+async def _gather_created(team_id: int, created: list, *coros) -> list:
+    """
+    Runs independent Discord requests concurrently.
+    Every role or channel that was created is appended to `created`, and its ID stored on the
+    pending team row, before any failure is re-raised.
+    """
+    results = await asyncio.gather(*coros, return_exceptions=True)
+    new_objects = [result for result in results if isinstance(result, (discord.Role, discord.abc.GuildChannel))]
+    created += new_objects
+    records.set_pending_team_ids(team_id, {_team_id_column(obj): obj.id for obj in new_objects})
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+    return results
+
+async def provision_team_resources(guild: discord.Guild, team_id: int, team_name: str, created: list):
+    """
+    Creates the role and channels for a reserved team, running requests that don't depend
+    on each other at the same time. Created objects are recorded in `created` as they appear.
+
+    Returns:
+        tuple: (team_role, category_channel, text_channel, voice_channel or None)
+    """
+    all_access_role = guild_index.role("all-access")
+    channel_name = team_name.replace(' ', '-')
+
+    # The team role is granted on the category after both exist, so they can be created together
+    category_channel_perms = {
+        all_access_role: discord.PermissionOverwrite(view_channel=True),
+        guild.default_role: discord.PermissionOverwrite(view_channel=False)
+    }
+
+    def text_channel_perms(team_role):
+        return {
+            all_access_role: discord.PermissionOverwrite(view_channel=True),
+            guild.default_role: discord.PermissionOverwrite(view_channel=False),  
+            team_role: discord.PermissionOverwrite(view_channel=True)  
+        }
+
+    def voice_channel_perms(team_role):
+        return {
+            team_role: discord.PermissionOverwrite(connect=True, view_channel=True, speak=True),
+            all_access_role: discord.PermissionOverwrite(connect=True, view_channel=True, speak=True),
+            guild.default_role:  discord.PermissionOverwrite(view_channel=False)
+        }
+
+    # Case 1: Each team has their own category and voice channel
+    if not config.discord_shared_categories:
+        team_role, category_channel = await _gather_created(team_id, created,
+            guild.create_role(name=team_name),
+            guild.create_category_channel(f"Team {team_id} - {team_name}", overwrites=category_channel_perms)
+        )
+        text_channel, voice_channel, _ = await _gather_created(team_id, created,
+            category_channel.create_text_channel(f"{channel_name}-text", overwrites=text_channel_perms(team_role)),
+            category_channel.create_voice_channel(f"{channel_name}-voice", overwrites=voice_channel_perms(team_role)),
+            category_channel.set_permissions(team_role, view_channel=True)
+        )
+        return team_role, category_channel, text_channel, voice_channel
+
+    # Case 2: Categories hold text-channels 1-50, etc
+    channels_per_category = 50
+    latest_category_id = records.get_latest_category()
+    category_channel = guild.get_channel(latest_category_id) if latest_category_id else None
+
+    if not category_channel or len(category_channel.channels) >= channels_per_category: # New category channel needs made
+        team_role, category_channel = await _gather_created(team_id, created,
+            guild.create_role(name=team_name),
+            guild.create_category_channel(f"Teams {team_id} - {(team_id - 1) + channels_per_category}", overwrites=category_channel_perms)
+        )
+    else:                                                                                 # Use a previous team's category channel
+        team_role, = await _gather_created(team_id, created, guild.create_role(name=team_name))
+
+    text_channel, = await _gather_created(team_id, created,
+        category_channel.create_text_channel(f"{team_id}-{channel_name}-text", overwrites=text_channel_perms(team_role))
+    )
+    return team_role, category_channel, text_channel, None
 
-    if text: await text.delete()
-    if voice: await voice.delete()
-    if role: await role.delete()
-    if category and not config.discord_shared_categories: await category.delete()
+async def rollback_team_resources(team_id: int, created: list):
+    """ Undoes a failed team creation by deleting what was created and releasing the pending team row. """
 
+    # Channels go before the categories holding them
+    channels = [obj for obj in created if not isinstance(obj, (discord.Role, discord.CategoryChannel))]
+    others = [obj for obj in created if obj not in channels]
+    for batch in (channels, others):
+        for result in await asyncio.gather(*(obj.delete() for obj in batch), return_exceptions=True):
+            if isinstance(result, Exception):
+                logger.error(f"Could not roll back part of team {team_id}: {result}")
+
+    records.remove_team(team_id)
 
 def can_join_team(added_member: discord.Member, capstone_team: bool = None) -> int: # TESTED
     """ Checks if User can join a team whether capstone, not capstone, or unspecified """
@@ -203,7 +666,7 @@ def can_join_team(added_member: discord.Member, capstone_team: bool = None) -> i
         return -2
 
     # Check if add_user is already on a team
-    if records.get_user_team_id(added_member.id):
+    if guild_index.team_of(added_member.id):
         return -3
     
     # Check if user can join if a capstone team if relavent (not None)
@@ -212,46 +675,57 @@ def can_join_team(added_member: discord.Member, capstone_team: bool = None) -> i
     
     return 0
 
+async def team_name_autocomplete(interaction: discord.Interaction, current: str) -> list:
+    """ Suggests team names starting with what the user has typed so far. """
+    return [app_commands.Choice(name=name, value=name) for name, _ in guild_index.team_names.search(current, 25)]
+
 async def perform_team_join(member: discord.Member, team_id: int): # TESTED
     
     # DB Update
     records.join_team(member.id, team_id)
+    guild_index.set_member_team(member.id, team_id)
     
-    guild = bot.get_guild(config.discord_guild_id)
-    team_data = records.get_team(team_id)
+    team_data = guild_index.team(team_id)
     
     # Get Roles to add
     roles_to_add = []
-    if team_data and 'role_id' in team_data:
-        t_role = guild.get_role(team_data['role_id'])
-        if t_role: roles_to_add.append(t_role)
-    a_role = guild.get_role(config.discord_team_assigned_role_id)
+    if team_data and team_data['role']: roles_to_add.append(team_data['role'])
+    a_role = guild_index.role("team-assigned")
     if a_role: roles_to_add.append(a_role)
 
     # Add Roles to Users
     if roles_to_add:
         await member.add_roles(*roles_to_add)
 
+    # Stop the countdown to removal if the team was too small
+    if records.get_team_size(team_id) >= MIN_TEAM_SIZE:
+        timer_scheduler.cancel(f"team_formation:{team_id}")
+
 async def perform_team_leave(member: discord.Member, team_id: int): # TESTED 
 
-    guild = bot.get_guild(config.discord_guild_id)
-    team_data = records.get_team(team_id)
+    team_data = guild_index.team(team_id)
     
     # Drop Team
     records.leave_team(member.id)
+    guild_index.set_member_team(member.id, None)
     
     # Get Roles to Remove
     roles_to_remove = []
-    if team_data and 'role_id' in team_data:
-        t_role = guild.get_role(team_data['role_id'])
-        if t_role: roles_to_remove.append(t_role)
-    a_role = guild.get_role(config.discord_team_assigned_role_id)
+    if team_data and team_data['role']: roles_to_remove.append(team_data['role'])
+    a_role = guild_index.role("team-assigned")
     if a_role: roles_to_remove.append(a_role)
 
     # Remove Roles from User
     if roles_to_remove:
         await member.remove_roles(*roles_to_remove)
 
+    # Give a team that is now too small TEAM_FORMATION_TIMEOUT seconds to add a teammate
+    if 0 < records.get_team_size(team_id) < MIN_TEAM_SIZE:
+        timer_scheduler.schedule("team_formation", {'team_id': team_id}, TEAM_FORMATION_TIMEOUT, key=f"team_formation:{team_id}")
+        if team_data and team_data['text']:
+            deadline = int(time.time() + TEAM_FORMATION_TIMEOUT)
+            await team_data['text'].send(embed=create_embed("⏳ Team Too Small", f"Teams need at least {MIN_TEAM_SIZE} members. Add a teammate with `/add_member` before <t:{deadline}:T> (<t:{deadline}:R>) or this team will be removed."))
+
 
 #-------------------"/" Command Methods-----------------------------
 
@@ -341,7 +815,7 @@ async def verify(interaction: discord.Interaction, email_or_code: str): # TESTED
         await sync_user_roles(user)
         
         # Send the user a message that they have been verified and the next steps
-        await interaction.followup.send(content=f"Welcome {records.get_first_name(email)}! \nYou have been verified. Please check the {bot.get_guild(config.discord_guild_id).get_channel(config.discord_start_here_channel_id).mention} channel for next steps.")
+        await interaction.followup.send(content=f"Welcome {records.get_first_name(email)}! \nYou have been verified. Please check the {guild_index.channel("start-here").mention} channel for next steps.")
     
     # Case 2: Email was entered
     else:    
@@ -357,8 +831,40 @@ async def verify(interaction: discord.Interaction, email_or_code: str): # TESTED
             await interaction.followup.send(content=f"A User with that email address is already verified. \nPlease reregister with a different email address at {config.contact_registration_link}")
             return
 
+        # ------------- Rate Limits --------------------
+
+        # A code already sent to this email for this user is resent instead of replaced
+        pending = records.get_user_code(user.id)
+        has_pending_code = pending is not None and pending['email'] == email
+
+        retry_after = max(verify_user_limiter.retry_after(user.id), verify_email_limiter.retry_after(email))
+        if retry_after:
+            reminder = f"The code we already sent to `<{email}>` is still valid. " if has_pending_code else ""
+            await interaction.followup.send(content=f"You have requested too many verification emails. {reminder}Please check your inbox and junk folder, or try again in {int(retry_after) + 1} seconds.")
+            return
+
+        retry_after = verify_global_limiter.retry_after()
+        if retry_after:
+            await interaction.followup.send(content=f"Lots of people are verifying right now! Please try again in {int(retry_after) + 1} seconds.")
+            return
+
+        # Tokens are taken before sending so concurrent requests can't overspend, and given back if the email fails
+        verify_user_limiter.consume(user.id)
+        verify_email_limiter.consume(email)
+        verify_global_limiter.consume()
+
         # ------------- Happy Case --------------------
 
+        if has_pending_code:
+            if await send_verification_email(email, pending['code'], user.name):
+                # The resent code is valid for the full expiration time again
+                schedule_code_expiry(pending['code'])
+                await interaction.followup.send(content=f"We have resent your verification code to `<{email}>`. Please check that email and enter the code in this format \n `/verify (code)`\n\nBe sure to check your junk folder if you have trouble finding it")
+            else:
+                refund_verify_limits(user.id, email)
+                await interaction.followup.send(content="Failed to send verification email. Please contact an organizer for assistance.")
+            return
+
         # NOTE: DB automatically replaces any code entry that matches discord_id, code, or email
         # Send Verification Info to web for update
         CODE = generate_random_code(6)
@@ -369,11 +875,11 @@ async def verify(interaction: discord.Interaction, email_or_code: str): # TESTED
             records.add_code(email, user.id, CODE)
             await interaction.followup.send(content=f"Check your inbox for an email from `<{config.email_address}>` with a verification link. Please check that email and enter the code in this format \n `/verify (code)`\n\nBe sure to check your junk folder if you have trouble finding it")
         else:
+            refund_verify_limits(user.id, email)
             await interaction.followup.send(content="Failed to send verification email. Please contact an organizer for assistance.")
+            return
 
-        # Wait for timeout then delete verification code
-        await asyncio.sleep(config.email_code_expiration_time)
-        records.remove_code(CODE)
+        schedule_code_expiry(CODE)
 
 @app_commands.guild_only()
 @bot.tree.command(name="create_team", description="Create a new team for this event")
@@ -453,61 +959,45 @@ async def create_team(interaction: discord.Interaction, team_name: str, teammate
         await interaction.followup.send(ephemeral=True, content=f"Team creation failed - No teammates could be added. \nChoose a different teammate or reach out to them to fix their problem.")
         return
 
-    # -------------------- Create Team Channels -------------------------
+    # -------------------- Reserve Team (Pending) -----------------------
 
-    team_role = await interaction.guild.create_role(name=team_name)
+    # Claim the name and team number first, so a concurrent or failed creation can't take them
+    team_id = records.reserve_team(team_name, is_capstone)
+    if team_id is None:
+        await interaction.followup.send(
+            content="That team name is already in use. Please chose a different name")
+        return
 
-    category_channel_perms = {
-        interaction.guild.get_role(config.discord_all_access_pass_role_id): discord.PermissionOverwrite(view_channel=True),
-        interaction.guild.default_role: discord.PermissionOverwrite(view_channel=False),  
-        team_role: discord.PermissionOverwrite(view_channel=True)            
-    }
-    text_channel_perms = {
-        interaction.guild.get_role(config.discord_all_access_pass_role_id): discord.PermissionOverwrite(view_channel=True),
-        interaction.guild.default_role: discord.PermissionOverwrite(view_channel=False),  
-        team_role: discord.PermissionOverwrite(view_channel=True)  
-    }
-    voice_channel_perms={
-        team_role: discord.PermissionOverwrite(connect=True, view_channel=True, speak=True),
-        interaction.guild.get_role(config.discord_all_access_pass_role_id): discord.PermissionOverwrite(connect=True, view_channel=True, speak=True),
-        interaction.guild.default_role:  discord.PermissionOverwrite(view_channel=False)
-    }
+    # -------------------- Create Team Channels -------------------------
 
-    next_team_id = records.get_next_team_id()
-    category_channel = None
-    text_channel = None
-    voice_channel = None
+    created = [] # Every Discord object made so far, so a failure can be rolled back
+    try:
+        team_role, category_channel, text_channel, voice_channel = await provision_team_resources(interaction.guild, team_id, team_name, created)
+
+        # ----------------------- Create Team ------------------------
+
+        # Commit the team, its lead, and its members in one transaction
+        records.activate_team(
+            team_id,
+            team_role.id,
+            category_channel.id,
+            text_channel.id,
+            voice_channel.id if voice_channel else None,
+            user.id,
+            [mem.id for mem in valid_members]
+        )
+    except Exception as e:
+        logger.error(f"Creating team <{team_name}> failed, rolling back: {e}")
+        await rollback_team_resources(team_id, created)
+        await interaction.followup.send(content="Team creation failed. Please try again or contact an organizer for assistance.")
+        return
 
-    # Case 1: Each team has their own category and voice channel
-    if not config.discord_shared_categories:
-        
-        category_channel = await interaction.guild.create_category_channel(f"Team {next_team_id} - {team_name}", overwrites=category_channel_perms)
-        text_channel = await category_channel.create_text_channel(f"{team_name.replace(' ','-')}-text", overwrites=text_channel_perms)
-        voice_channel = await category_channel.create_voice_channel(f"{team_name.replace(' ','-')}-voice", overwrites=voice_channel_perms)
+    if config.discord_shared_categories and category_channel in created:
+        records.push_new_category(category_channel.id)
 
-    # Case 2: Categories hold text-channels 1-50, etc
-    else:
-        channels_per_category = 50
-        new_channel_needed = ((next_team_id - 1) % channels_per_category == 0) or not records.get_latest_category()
-        
-        if new_channel_needed: # New category channel needs made
-            category_channel = await interaction.guild.create_category_channel(f"Teams {next_team_id} - {(next_team_id - 1) + channels_per_category}", overwrites=category_channel_perms)
-            records.push_new_category(category_channel.id)
-        else:                  # Use a previous team's category channel
-            category_channel = bot.get_channel(records.get_latest_category())
-        text_channel = await category_channel.create_text_channel(f"{next_team_id}-{team_name.replace(' ','-')}-text", overwrites=text_channel_perms) # Inherit perms from Category
-
-
-    # ----------------------- Create Team ------------------------
-
-    team_id = records.create_team(
-        team_name, 
-        is_capstone,
-        team_role.id, 
-        category_channel.id, 
-        text_channel.id, 
-        voice_channel.id if voice_channel else None
-    )
+    guild_index.add_team(interaction.guild, records.get_team(team_id))
+    for mem in [user, *valid_members]:
+        guild_index.set_member_team(mem.id, team_id)
 
     # Respond to creator and send message to team channel
     await interaction.followup.send(content=f'Your Team ({team_role.mention}) has successfully been created!\n Your Team Channel: {text_channel.mention}')
@@ -523,14 +1013,24 @@ async def create_team(interaction: discord.Interaction, team_name: str, teammate
             ), 
             inline=False
         )
-    await text_channel.send(embed=welcome_embed)
 
-    # Add Author and Valid Teammates to team
-    await perform_team_join(user, team_id)  # Add author to team
-    records.set_team_lead(team_id, user.id) # Make author team_lead
-    for mem in valid_members:
-        await perform_team_join(mem, team_id)
-        await text_channel.send(embed=create_embed(title="👋 New Teammate!", description=f"{mem.mention} has been added to the team by {interaction.user.mention}"))
+    # Give the author and teammates their roles while the welcome message is sent
+    roles_to_add = [team_role]
+    a_role = guild_index.role("team-assigned")
+    if a_role: roles_to_add.append(a_role)
+
+    results = await asyncio.gather(
+        text_channel.send(embed=welcome_embed),
+        *(mem.add_roles(*roles_to_add) for mem in [user, *valid_members]),
+        return_exceptions=True
+    )
+    results += await asyncio.gather(
+        *(text_channel.send(embed=create_embed(title="👋 New Teammate!", description=f"{mem.mention} has been added to the team by {interaction.user.mention}")) for mem in valid_members),
+        return_exceptions=True
+    )
+    for result in results:
+        if isinstance(result, Exception):
+            logger.error(f"Team <{team_name}> was created but a follow-up step failed: {result}")
 
 @app_commands.guild_only()
 @bot.tree.command(name="leave_team", description="Leave your current team")
@@ -553,17 +1053,17 @@ async def leave_team(interaction: discord.Interaction): # TESTED
     # ------------- Do Validation Checks --------------------
 
     # Ensure user is on a team
-    if not records.get_user_team_id(user.id):
+    team_id = guild_index.team_of(user.id)
+    if not team_id:
         await interaction.followup.send(content="You cannot leave a team since you are not assigned to one!")
         return
 
     # ------------- Happy Case --------------------
 
     # Grab Team Relavent Info
-    team_id = records.get_user_team_id(user.id)
-    team_data = records.get_team(team_id)
-    team_text_channel = interaction.guild.get_channel(team_data['text_id'])
-    team_role = interaction.guild.get_role(team_data['role_id'])
+    team_data = guild_index.team(team_id)
+    team_text_channel = team_data['text']
+    team_role = team_data['role']
 
     # Remove user from team
     await perform_team_leave(user, team_id)
@@ -579,7 +1079,8 @@ async def leave_team(interaction: discord.Interaction): # TESTED
         # Chose a random other teammate to assign as lead
         new_lead_id = random.choice(records.get_team_members(team_id))['discord_id']        
         records.set_team_lead(team_id, new_lead_id)
-        await team_text_channel.send(embed=create_embed("👋 Teammate Left!", f"{user.mention} has left the team.\n{interaction.guild.get_member(new_lead_id).mention} has been randomly assigned as the new Team Lead."))
+        guild_index.set_team_lead(team_id, new_lead_id)
+        await team_text_channel.send(embed=create_embed("👋 Teammate Left!", f"{user.mention} has left the team.\n{(await fetch_member(interaction.guild, new_lead_id)).mention} has been randomly assigned as the new Team Lead."))
 
     else:
         await team_text_channel.send(embed=create_embed("👋 Teammate Left!", f"{user.mention} has left the team."))  
@@ -602,25 +1103,24 @@ async def add_member(interaction: discord.Interaction, member: discord.Member):
     # ------------- Do Validation Checks --------------------
 
     # Check that team_user is in a team
-    if not records.get_user_team_id(team_user.id):
+    team_id = guild_index.team_of(team_user.id)
+    if not team_id:
         await interaction.followup.send(content='Failed to add team member. You are not currently in a team. You must be in a team to add a team member. Please use `/create_team` to create a team or have another participant use `/add_member` to add you to their team')
         return 
     
     # Check if member is already on your team
-    if records.get_user_team_id(team_user.id) == records.get_user_team_id(member.id):
+    if team_id == guild_index.team_of(member.id):
         await interaction.followup.send(content=f'Failed to add team member. {member.mention} is already on your team!')
         return 
     
     # Check that team is not full
-    team_id = records.get_user_team_id(team_user.id)
-    is_capstone = records.get_team(team_id)['is_capstone']
+    is_capstone = guild_index.team(team_id)['is_capstone']
     max_team_size = CAPSTONE_TEAM_SIZE if is_capstone else MAX_TEAM_SIZE
     if records.get_team_size(team_id) >= max_team_size:
         await interaction.followup.send(content=f'Failed to add team member. There is no space in your team. Teams can have a maximum of {max_team_size} members.')
         return
 
     # Check if user can join the team
-    is_capstone = records.get_team(team_id)
     match can_join_team(added_user):
         case -1 | -2 : await interaction.followup.send(content=f"Failed to add team member. {added_user.mention} is not a verified participant."); return
         case      -3 : await interaction.followup.send(content=f"Failed to add team member. {added_user.mention} is already on a team. To join, they must leave using /leave_team"); return
@@ -631,9 +1131,7 @@ async def add_member(interaction: discord.Interaction, member: discord.Member):
     # Add the member to the team
     await perform_team_join(added_user, team_id)
 
-    team_data = records.get_team(team_id)
-    team_role = interaction.guild.get_role(team_data['role_id'])
-    text_channel = interaction.guild.get_channel(team_data['text_id'])
+    text_channel = guild_index.team(team_id)['text']
 
     # Send confirmation message to team_user
     await interaction.followup.send(content=f'{added_user.mention} has been added successfully')
@@ -659,18 +1157,19 @@ async def remove_member(interaction: discord.Interaction, member: discord.Member
     # ------------- Do Validation Checks --------------------
 
     # Check that team_user is in a team
-    if not records.get_user_team_id(team_user.id):
+    team_id = guild_index.team_of(team_user.id)
+    if not team_id:
         await interaction.followup.send(
             content="Failed to remove team member. You are not currently in a team."
         )
         return
 
     # Check that user is the team_lead
-    team_id = records.get_user_team_id(team_user.id)
-    team_lead_id = records.get_team(team_id)["team_lead"]
+    team_data = guild_index.team(team_id)
+    team_lead_id = team_data["team_lead"]
     if team_lead_id != team_user.id:
         await interaction.followup.send(
-            content=f"Only the Team Lead can invoke this command!\n{interaction.guild.get_member(team_lead_id).mention} is your lead. Contact them to invoke the command"
+            content=f"Only the Team Lead can invoke this command!\n{(await fetch_member(interaction.guild, team_lead_id)).mention} is your lead. Contact them to invoke the command"
         )
         return
 
@@ -682,7 +1181,7 @@ async def remove_member(interaction: discord.Interaction, member: discord.Member
         return
 
     # Check if member is on your team
-    if records.get_user_team_id(team_user.id) != records.get_user_team_id(member.id):
+    if team_id != guild_index.team_of(member.id):
         await interaction.followup.send(
             content=f"Failed to remove team member. {member.mention} is not on your team!"
         )
@@ -693,8 +1192,7 @@ async def remove_member(interaction: discord.Interaction, member: discord.Member
     # Remove member from team
     await perform_team_leave(member, team_id)
 
-    team_data = records.get_team(team_id)
-    text_channel = interaction.guild.get_channel(team_data["text_id"])
+    text_channel = team_data["text"]
 
     # Send confirmation message to team_user
     await interaction.followup.send(content=f"{member.mention} has been removed successfully.")
@@ -733,43 +1231,73 @@ async def my_team(interaction: discord.Interaction):
     await interaction.response.defer(ephemeral=True)
 
     # Check if user is on a team
-    team_id = records.get_user_team_id(user.id)
+    team_id = guild_index.team_of(user.id)
     if not team_id:
         await interaction.followup.send(content="You are not currently assigned to a team.")
         return
 
     # Retrieve team information
-    team_data = records.get_team(team_id)
+    team_data = guild_index.team(team_id)
     if not team_data:
         await interaction.followup.send(
             content="There was an error retrieving your team information. Please contact an organizer for assistance."
         )
         return
-    team_name = team_data["name"]
-    team_lead_id = team_data["team_lead"]
-    team_lead_member = guild.get_member(team_lead_id)
-    if not team_lead_member:
-        await interaction.followup.send(
-            content="There was an error retrieving your team information. Please contact an organizer for assistance."
+
+    # Reuse the team's roster if nothing about the team has changed since it was last built
+    embed = guild_index.roster(team_id)
+    if not embed:
+        team_lead_member = await fetch_member(guild, team_data["team_lead"])
+        if not team_lead_member:
+            await interaction.followup.send(
+                content="There was an error retrieving your team information. Please contact an organizer for assistance."
+            )
+            return
+
+        # Format member list
+        mentions = []
+        for member in records.get_team_members(team_id):
+            discord_member = await fetch_member(guild, member["discord_id"])
+            if discord_member:
+                mentions.append(f"- {discord_member.mention}")
+        member_list = "\n".join(mentions)
+
+        embed = create_embed(
+            title=f"Your Team: {team_data['name']}",
+            description=f"**Team Lead:** {team_lead_member.mention}\n\n**Members:**\n{member_list}",
         )
-        return
+        guild_index.cache_roster(team_id, embed)
+
+    await interaction.followup.send(embed=embed)
+
 
-    team_members = records.get_team_members(team_id)
+@app_commands.guild_only()
+@bot.tree.command(name="team_info", description="Look up a team by name")
+@app_commands.describe(team_name="Name of the team to look up")
+@app_commands.autocomplete(team_name=team_name_autocomplete)
+async def team_info(interaction: discord.Interaction, team_name: str):
+    """
+    Shows a team's number, lead, and size, so participants can find each other's teams.
+
+    Args:
+        interaction (discord.Interaction): The Context of the Interaction.
+        team_name (str): The name of the team to look up.
+    """
+    team_id = guild_index.team_names.get(team_name)
+    if not team_id:
+        await interaction.response.send_message(content=f"There is no team named `<{team_name}>`.", ephemeral=True)
+        return
 
-    # Format member list
-    mentions = []
-    for member in team_members:
-        discord_member = guild.get_member(member["discord_id"])
-        if discord_member:
-            mentions.append(f"- {discord_member.mention}")
-    member_list = "\n".join(mentions)
+    team_data = guild_index.team(team_id)
+    team_size = sum(1 for t in guild_index.member_teams.values() if t == team_id)
+    max_team_size = CAPSTONE_TEAM_SIZE if team_data['is_capstone'] else MAX_TEAM_SIZE
+    lead = f"<@{team_data['team_lead']}>" if team_data['team_lead'] else "None"
 
-    # Create and send embed with team information
     embed = create_embed(
-        title=f"Your Team: {team_name}",
-        description=f"**Team Lead:** {team_lead_member.mention}\n\n**Members:**\n{member_list}",
+        title=f"Team #{team_id}: {team_data['name']}",
+        description=f"**Team Lead:** {lead}\n**Members:** {team_size}/{max_team_size}" + ("\n🎓 Capstone Team" if team_data['is_capstone'] else "")
     )
-    await interaction.followup.send(embed=embed)
+    await interaction.response.send_message(embed=embed, ephemeral=True)
 
 
 # ------------------- Admin Only Commands ----------------------
@@ -828,26 +1356,31 @@ async def overify(interaction: discord.Interaction, member_to_promote: discord.M
 @app_commands.guild_only()
 @app_commands.default_permissions(administrator=True)
 @bot.tree.command(name="delete_team", description="Remove Team (Organizers only)") 
-async def delete_team(interaction: discord.Interaction, team_role: discord.Role, reason_for_removal: str): # TESTED
+@app_commands.describe(team_name="Name of the team to remove")
+@app_commands.autocomplete(team_name=team_name_autocomplete)
+async def delete_team(interaction: discord.Interaction, team_name: str, reason_for_removal: str): # TESTED
     """
     Delete a team and its associated data from the event.
 
     Args:
         ctxt (discord.Interaction): The Context of the Interaction
-        flags (removeTeamFlag): Flags containing the 'team_role' and 'reason' for removal
+        team_name (str): The name of the team to remove
+        reason_for_removal (str): Sent to each team member
     """
     await interaction.response.defer(ephemeral=True)
 
     # Retrieve team details before removal
-    team_name = team_role.name
-    team_id = records.get_team(team_name)['id']
-    members = records.get_team_members(team_name)
+    team_id = guild_index.team_names.get(team_name)
+    if not team_id:
+        await interaction.followup.send(content=f"There is no team named `<{team_name}>`.")
+        return
+    members = records.get_team_members(team_id)
 
     # ------------- Happy Case --------------------
 
     # Notify team and admin about removal
     for member in members:
-        await interaction.guild.get_member(member['discord_id']).send(
+        await (await fetch_member(interaction.guild, member['discord_id'])).send(
             content=f"Your team has been removed from the event. \nReason: `{reason_for_removal}`. \nYou may create a new team but continued failure to comply may result in being permanently removed")
     
     await interaction.followup.send(content=f"The team `<{team_name}>` has been removed and the members have been notified")
@@ -855,43 +1388,152 @@ async def delete_team(interaction: discord.Interaction, team_role: discord.Role,
     # Remove channels and remove team stats from members
     await handle_team_deletion(team_id)    
 
+@app_commands.guild_only()
+@app_commands.default_permissions(administrator=True)
+@bot.tree.command(name="delete_all_teams", description="Remove every team and its channels (Organizers only)")
+@app_commands.describe(confirm="Type DELETE to confirm")
+async def delete_all_teams(interaction: discord.Interaction, confirm: str):
+    """
+    Queues a background job that tears down every team, e.g. at the end of the event.
+
+    Args:
+        interaction (discord.Interaction): The Context of the Interaction.
+        confirm (str): Must be "DELETE" for anything to happen.
+    """
+    await interaction.response.defer(ephemeral=True)
+
+    if confirm != "DELETE":
+        await interaction.followup.send(content="No teams were removed. Type `DELETE` in the confirm option to remove every team.")
+        return
+
+    team_ids = list(guild_index.teams)
+    job_id = job_worker.enqueue("delete_teams", {'team_ids': team_ids}, interaction.user.id)
+    await interaction.followup.send(content=f"Queued the removal of {len(team_ids)} teams as job #{job_id}. Use `/jobs` to follow its progress.")
+
+@app_commands.guild_only()
+@app_commands.default_permissions(administrator=True)
+@bot.tree.command(name="resync_all", description="Re-sync event roles for every verified member (Organizers only)")
+@app_commands.describe(apply="Apply the changes. Leave this off to only see a summary (dry run)")
+async def resync_all(interaction: discord.Interaction, apply: bool = False):
+    """
+    Reconciles the roles in role_map for every verified member against the database.
+    Without `apply`, only reports what would change. With it, queues a background job.
+
+    Args:
+        interaction (discord.Interaction): The Context of the Interaction.
+        apply (bool): Whether to apply the changes or only do a dry run.
+    """
+    await interaction.response.defer(ephemeral=True)
+
+    if apply:
+        job_id = job_worker.enqueue("resync", {}, interaction.user.id)
+        await interaction.followup.send(content=f"Queued the role resync as job #{job_id}. Use `/jobs` to follow its progress.")
+        return
+
+    changes, summary = await get_role_changes(interaction.guild)
+    footer = "\n\nRun `/resync_all apply:True` to apply these changes." if changes else "\n\nEveryone is already in sync."
+    await interaction.followup.send(embed=create_embed("🔍 Role Resync (Dry Run)", summary + footer))
+
 @app_commands.guild_only()
 @app_commands.default_permissions(administrator=True)
 @bot.tree.command(name="broadcast", description="Broadcast a message to each team channel")
 async def broadcast(interaction: discord.Interaction, message: str):
     """
-    Broadcasts a message to each team's text channel.
+    Queues a background job that broadcasts a message to each team's text channel.
 
     Args:
         interaction (discord.Interaction): The Context of the Interaction.
         message (str): The message to broadcast.
     """
+    job_id = job_worker.enqueue("broadcast", {'message': message, 'team_ids': list(guild_index.teams)}, interaction.user.id)
+    await interaction.response.send_message(
+        content=f"Queued the broadcast to {len(guild_index.teams)} team channels as job #{job_id}. Use `/jobs` to follow its progress.",
+        ephemeral=True
+    )
 
-    guild = interaction.guild
-    if not guild:
-        await interaction.response.send_message(
-            content="There was an error retrieving the Discord server information. Please contact an organizer for assistance.",
-            ephemeral=True,
-        )
-        return
-    await interaction.response.defer(ephemeral=True)
+@app_commands.guild_only()
+@app_commands.default_permissions(administrator=True)
+@bot.tree.command(name="schedule_announcement", description="Post an announcement later (Organizers only)")
+@app_commands.describe(
+    message="The announcement",
+    minutes="Minutes from now to post it",
+    channel="Channel to post it in. Leave empty to broadcast it to every team channel"
+)
+async def schedule_announcement(interaction: discord.Interaction, message: str, minutes: app_commands.Range[int, 1, 10080], channel: discord.TextChannel = None):
+    """
+    Schedules an announcement, which is kept across restarts.
 
-    teams = records.get_all_teams()
-    for team in teams:
-        team_text_channel = cast(discord.TextChannel, guild.get_channel(team.get("text_id")))
-        role_obj = guild.get_role(team.get("role_id"))
-        if not role_obj:
-            continue
-        team_mention = role_obj.mention
-        if team_text_channel:
-            try:
-                await team_text_channel.send(embed=create_embed(title="📫 Broadcasted Message", description=message))
-            except Exception as e:
-                print(f"Failed to send message to {team_text_channel.name}: {e}")
+    Args:
+        interaction (discord.Interaction): The Context of the Interaction.
+        message (str): The announcement.
+        minutes (int): Minutes from now to post it.
+        channel (discord.TextChannel): Channel to post it in, or None to broadcast it to every team.
+    """
+    payload = {'message': message, 'channel_id': channel.id if channel else None, 'created_by': interaction.user.id}
+    timer_scheduler.schedule("announcement", payload, minutes * 60)
+
+    due = int(time.time() + minutes * 60)
+    target = channel.mention if channel else "every team channel"
+    await interaction.response.send_message(content=f"Your announcement will be posted to {target} at <t:{due}:f> (<t:{due}:R>).", ephemeral=True)
+
+@app_commands.guild_only()
+@app_commands.default_permissions(administrator=True)
+@bot.tree.command(name="jobs", description="Show the progress of recent background jobs (Organizers only)")
+async def jobs(interaction: discord.Interaction):
+    """
+    Lists the most recent background jobs with their status and progress.
+
+    Args:
+        interaction (discord.Interaction): The Context of the Interaction.
+    """
+    STATUS_ICONS = {'queued': '⏳', 'running': '🔄', 'done': '✅', 'failed': '❌'}
+
+    lines = []
+    for job in records.get_recent_jobs(10):
+        progress = f"{job['progress']}/{job['total']}" if job['total'] is not None else f"{job['progress']}"
+        line = f"{STATUS_ICONS.get(job['status'], '')} **#{job['id']} {job['kind']}** - {job['status']}, {progress} - queued <t:{job['created_at']}:R>"
+        if job['result']: line += f"\n  {job['result'][:200]}"
+        lines.append(line)
+
+    embed = create_embed(title="🗂️ Background Jobs", description="\n".join(lines) if lines else "No jobs have been queued yet.")
+    await interaction.response.send_message(embed=embed, ephemeral=True)
 
-    await interaction.followup.send(
-        content="Broadcast message sent to all team channels.", ephemeral=True
+@app_commands.guild_only()
+@app_commands.default_permissions(administrator=True)
+@bot.tree.command(name="loop_lag", description="Show event loop lag and recent stalls (Organizers only)")
+async def loop_lag(interaction: discord.Interaction):
+    """
+    Shows a histogram of event loop scheduling lag over the last hour, and the most recent
+    stalls with the handler that was running and a sample of its stack.
+
+    Args:
+        interaction (discord.Interaction): The Context of the Interaction.
+    """
+    histogram = loop_monitor.histogram()
+    total = sum(count for _, count in histogram) or 1
+
+    lines = []
+    for bound, count in histogram:
+        label = f"< {bound * 1000:g} ms" if bound else f">= {histogram[-2][0] * 1000:g} ms"
+        bar = "█" * round(20 * count / total)
+        lines.append(f"{label:>10} | {bar} {count}")
+
+    cache_mode = "lean" if config.discord_lean_member_cache else "full"
+    memory = f"{peak_memory_mb():.0f} MB" if resource else "unavailable"
+    embed = create_embed(
+        title="⏱️ Event Loop Lag",
+        description=f"**Max lag:** {loop_monitor.max_lag() * 1000:.0f} ms (stall threshold {LOOP_LAG_THRESHOLD * 1000:.0f} ms)\n"
+                    f"**Member cache:** {cache_mode}, {len(interaction.guild.members)} cached, peak RSS {memory}\n```\n" + "\n".join(lines) + "\n```"
     )
+    for stall in loop_monitor.stalls()[:3]:
+        lag = f"{stall['lag'] * 1000:.0f} ms" if stall['lag'] is not None else "still blocked"
+        stack = stall['stack'][-900:] if stall['stack'] else "No stack sample"
+        embed.add_field(
+            name=f"<t:{int(stall['time'])}:T> - {stall['handler'] or 'unknown handler'} ({lag})",
+            value=f"```\n{stack}\n```",
+            inline=False
+        )
+    await interaction.response.send_message(embed=embed, ephemeral=True)
 
 @bot.hybrid_command(name="sync", description="Sync commands (Organizer Only)")
 @app_commands.default_permissions(administrator=True) 
@@ -930,12 +1572,106 @@ async def sync(ctx: commands.Context, spec: str):
     await ctx.send("Please provide a valid spec argument (local, global, clear)")
 
 
+_startup_complete = False
+
+async def setup_hook():
+    # Close cleanly on SIGTERM (sent by start.py's supervisor to stop or restart the bot)
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, lambda: asyncio.create_task(bot.close()))
+    except NotImplementedError:
+        pass # Not supported on Windows
+
+    # Beat from the event loop, so the supervisor notices if it gets stuck
+    if heartbeat:
+        background_tasks.append(asyncio.create_task(beat_forever(heartbeat)))
+
+bot.setup_hook = setup_hook
+
 # When the bot is ready, this automatically runs
 @bot.event
 async def on_ready(): 
-    print(f'Logged in as {bot.user}')
+    global _startup_complete
+    logger.info(f'Logged in as {bot.user}')
+
+    # on_ready also fires on reconnects, so only clean up after a restart
+    if not _startup_complete:
+        _startup_complete = True
+
+        # Watch for anything blocking the event loop, naming the command or event responsible
+        for command in [*bot.tree.walk_commands(), *bot.walk_commands()]:
+            loop_monitor.register_handler(f"/{command.qualified_name}", command.callback)
+        for name, handler in vars(bot).items():
+            if name.startswith("on_"): loop_monitor.register_handler(name, handler)
+        for kind, handler in job_worker.handlers.items():
+            loop_monitor.register_handler(f"job {kind}", handler)
+        for kind, handler in timer_scheduler.handlers.items():
+            loop_monitor.register_handler(f"timer {kind}", handler)
+        loop_monitor.start()
+        background_tasks.append(asyncio.create_task(write_metrics()))
+        background_tasks.append(asyncio.create_task(watch_role_changes()))
+
+        cache_mode = "lean" if config.discord_lean_member_cache else "full"
+        memory = f"{peak_memory_mb():.0f} MB peak RSS" if resource else "peak RSS unavailable"
+        logger.info(f'Ready in {time.perf_counter() - _process_start:.1f} seconds with a {cache_mode} member cache ({memory})')
+        if heartbeat: heartbeat.mark_ready()
+
+        # Roll back teams left pending by a creation that was interrupted mid-way
+        guild = bot.get_guild(config.discord_guild_id)
+        for team in records.get_pending_teams():
+            logger.info(f"Removing unfinished team <{team['name']}>")
+            created = [guild.get_role(team['role_id'])] + [guild.get_channel(team[column]) for column in ('category_id', 'text_id', 'voice_id')]
+            await rollback_team_resources(team['id'], [obj for obj in created if obj])
+
+    # (Re)build the index, since gateway events may have been missed while disconnected
+    guild = bot.get_guild(config.discord_guild_id)
+    guild_index.build(guild, index_role_map, index_channel_map, records.get_all_teams(), records.get_team_assignments())
+    logger.info(f'Indexed {len(guild_index.teams)} teams and {len(guild_index.member_teams)} team members')
+
+    # Jobs and timers use the index, so only start (or resume) them once it is built
+    job_worker.start()
+    timer_scheduler.start()
+
+@bot.event
+async def on_app_command_completion(interaction: discord.Interaction, command):
+    record_command_timing(interaction, "ok")
+
+# Keep the index from pointing at deleted roles and channels
+@bot.event
+async def on_guild_role_delete(role: discord.Role):
+    guild_index.forget_role(role.id)
+
+@bot.event
+async def on_guild_channel_delete(channel: discord.abc.GuildChannel):
+    guild_index.forget_channel(channel.id)
+
+# Don't keep serving fetched members (or "not in the server") after someone joins or leaves
+@bot.event
+async def on_member_join(member: discord.Member):
+    member_lru.pop(member.id)
+
+@bot.event
+async def on_raw_member_remove(payload: discord.RawMemberRemoveEvent):
+    member_lru.pop(payload.user.id)
    
-def start(): bot.run(config.discord_token)
+def start(process_heartbeat=None):
+    global heartbeat
+    heartbeat = process_heartbeat
+    log_listener = log_setup.setup_logging('bot.log', console_level=logging.INFO)
+
+    # Time database and Discord API calls made while handling slash commands.
+    # Interaction responses go through the webhook adapter rather than bot.http.
+    metrics.instrument_module(records, "db")
+    bot.http.request = metrics.timed_request(bot.http.request)
+    webhook_adapter = discord.webhook.async_.async_context.get()
+    webhook_adapter.request = metrics.timed_request(webhook_adapter.request)
+
+    try:
+        bot.run(config.discord_token, log_handler=None) # discord.py logs through log_setup's handlers
+    except Exception as e:
+        logger.critical(f"Bot stopped: {e!r}", exc_info=True)
+        raise
+    finally:
+        log_listener.stop()
 # ------------------------------------------------------------------
 
 # TODO: Allow 5 people to join a team if they are capstone
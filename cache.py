@@ -0,0 +1,212 @@
+import bisect
+import collections
+import time
+import discord
+
+'''
+In-memory caches for the bot process.
+
+GuildIndex holds the Discord objects the bot looks up on every command (event roles,
+team roles and channels) and which team each member is on. It is built once in on_ready
+from the database and kept up to date by the bot as teams change and by gateway events
+when roles or channels are deleted. It also caches each team's rendered /my_team roster,
+which is thrown away whenever that team's members, lead or name change.
+
+PrefixIndex answers "which names start with ..." with a binary search, for autocomplete.
+
+LRUCache keeps a bounded number of recently used values, e.g. members fetched from the API
+when discord.py's own member cache is turned off.
+'''
+
+class PrefixIndex:
+    """ Case-insensitive prefix search over names, kept in a sorted list. """
+
+    def __init__(self):
+        self._keys = []     # casefolded names, sorted
+        self._entries = []  # (name, value) in the same order as _keys
+
+    def __len__(self):
+        return len(self._keys)
+
+    def add(self, name: str, value):
+        key = name.casefold()
+        i = bisect.bisect_right(self._keys, key)
+        self._keys.insert(i, key)
+        self._entries.insert(i, (name, value))
+
+    def remove(self, name: str):
+        key = name.casefold()
+        i = bisect.bisect_left(self._keys, key)
+        while i < len(self._keys) and self._keys[i] == key:
+            if self._entries[i][0] == name:
+                del self._keys[i]
+                del self._entries[i]
+                return
+            i += 1
+
+    def get(self, name: str):
+        """ Returns the value stored for an exact name, or None. """
+        key = name.casefold()
+        i = bisect.bisect_left(self._keys, key)
+        while i < len(self._keys) and self._keys[i] == key:
+            if self._entries[i][0] == name:
+                return self._entries[i][1]
+            i += 1
+        return None
+
+    def search(self, prefix: str, limit: int = 25) -> list:
+        """ Returns up to `limit` (name, value) pairs whose name starts with `prefix`, in alphabetical order. """
+        key = prefix.casefold()
+        i = bisect.bisect_left(self._keys, key)
+        results = []
+        while i < len(self._keys) and len(results) < limit and self._keys[i].startswith(key):
+            results.append(self._entries[i])
+            i += 1
+        return results
+
+class LRUCache:
+    """ Keeps the `maxsize` most recently used entries, each for at most `ttl` seconds. """
+
+    def __init__(self, maxsize: int = 256, ttl: float = 300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = collections.OrderedDict()  # key -> (expiry, value), least recently used first
+
+    def __contains__(self, key) -> bool:
+        entry = self._entries.get(key)
+        return entry is not None and entry[0] > time.monotonic()
+
+    def get(self, key, default=None):
+        """ Returns the value stored for `key`, or `default` if it is missing or expired. """
+        if key not in self:
+            self._entries.pop(key, None)
+            return default
+        self._entries.move_to_end(key)
+        return self._entries[key][1]
+
+    def put(self, key, value):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def pop(self, key):
+        self._entries.pop(key, None)
+
+class GuildIndex:
+
+    def __init__(self):
+        self.ready = False
+        self.roles = {}         # role_map name -> discord.Role
+        self.channels = {}      # config channel name -> discord channel
+        self.teams = {}         # team_id -> team row dict plus 'role', 'category', 'text', 'voice' objects
+        self.member_teams = {}  # discord_id -> team_id
+        self.team_names = PrefixIndex()  # team name -> team_id
+        self.rosters = {}       # team_id -> cached /my_team embed
+
+    def build(self, guild: discord.Guild, role_ids: dict, channel_ids: dict, team_rows: list, member_teams: dict):
+        """
+        (Re)builds the whole index.
+
+        Args:
+            guild (discord.Guild): The event's guild.
+            role_ids (dict): Managed role names mapped to their role IDs.
+            channel_ids (dict): Configured channel names mapped to their channel IDs.
+            team_rows (list): Active team rows from records.get_all_teams().
+            member_teams (dict): Discord IDs mapped to team IDs from records.get_team_assignments().
+        """
+        self.roles = {name: guild.get_role(role_id) for name, role_id in role_ids.items()}
+        self.channels = {name: guild.get_channel(channel_id) for name, channel_id in channel_ids.items()}
+        self.teams = {}
+        self.team_names = PrefixIndex()
+        for row in team_rows:
+            self.add_team(guild, row)
+        self.member_teams = dict(member_teams)
+        self.rosters = {}
+        self.ready = True
+
+    # ------------------------- Lookups -------------------------
+
+    def role(self, name: str) -> discord.Role:
+        """ Returns a managed role by its role_map name, or None if it doesn't exist. """
+        return self.roles.get(name)
+
+    def channel(self, name: str):
+        """ Returns a configured channel by name, or None if it doesn't exist. """
+        return self.channels.get(name)
+
+    def team(self, team_id: int) -> dict:
+        """ Returns a team's row and Discord objects, or None if the team doesn't exist. """
+        return self.teams.get(team_id)
+
+    def team_of(self, discord_id: int) -> int:
+        """ Returns the team ID of a member, or None if they aren't on a team. """
+        return self.member_teams.get(discord_id)
+
+    def roster(self, team_id: int):
+        """ Returns the cached roster embed for a team, or None if it needs to be rebuilt. """
+        return self.rosters.get(team_id)
+
+    def cache_roster(self, team_id: int, embed: discord.Embed):
+        """ Caches a team's roster embed until its members, lead or name change. """
+        if team_id in self.teams:
+            self.rosters[team_id] = embed
+
+    # ------------------------- Updates -------------------------
+
+    def add_team(self, guild: discord.Guild, row: dict):
+        """ Adds or replaces a team using its database row. """
+        if row['id'] in self.teams:
+            self.team_names.remove(self.teams[row['id']]['name'])
+        self.rosters.pop(row['id'], None)
+        self.team_names.add(row['name'], row['id'])
+        self.teams[row['id']] = {
+            **row,
+            'role': guild.get_role(row['role_id']) if row['role_id'] else None,
+            'category': guild.get_channel(row['category_id']) if row['category_id'] else None,
+            'text': guild.get_channel(row['text_id']) if row['text_id'] else None,
+            'voice': guild.get_channel(row['voice_id']) if row['voice_id'] else None
+        }
+
+    def remove_team(self, team_id: int):
+        """ Forgets a team and every member assignment pointing at it. """
+        team = self.teams.pop(team_id, None)
+        if team:
+            self.team_names.remove(team['name'])
+        self.rosters.pop(team_id, None)
+        for discord_id in [d for d, t in self.member_teams.items() if t == team_id]:
+            del self.member_teams[discord_id]
+
+    def set_member_team(self, discord_id: int, team_id):
+        """ Records that a member joined a team, or left one if team_id is None. """
+        self.rosters.pop(self.member_teams.get(discord_id), None)
+        self.rosters.pop(team_id, None)
+        if team_id is None:
+            self.member_teams.pop(discord_id, None)
+        else:
+            self.member_teams[discord_id] = team_id
+
+    def set_team_lead(self, team_id: int, lead_id):
+        """ Records a new team lead. """
+        if team_id in self.teams:
+            self.teams[team_id]['team_lead'] = lead_id
+        self.rosters.pop(team_id, None)
+
+    def forget_role(self, role_id: int):
+        """ Drops a deleted role from every place it is referenced. """
+        for name, role in self.roles.items():
+            if role and role.id == role_id:
+                self.roles[name] = None
+        for team in self.teams.values():
+            if team['role'] and team['role'].id == role_id:
+                team['role'] = None
+
+    def forget_channel(self, channel_id: int):
+        """ Drops a deleted channel from every place it is referenced. """
+        for name, channel in self.channels.items():
+            if channel and channel.id == channel_id:
+                self.channels[name] = None
+        for team in self.teams.values():
+            for key in ('category', 'text', 'voice'):
+                if team[key] and team[key].id == channel_id:
+                    team[key] = None
@@ -69,4 +69,21 @@ web_port = int(config_data['web']['port'])
 web_api_key = config_data['web']['api_key']
 email_address = config_data['email']['address']
 email_password = config_data['email']['password']
-email_code_expiration_time = int(config_data['email']['code_expiration_time'])
\ No newline at end of file
+email_code_expiration_time = int(config_data['email']['code_expiration_time'])
+
+#Optional entries, with defaults for when they are missing from CONFIG_FILENAME
+discord_lean_member_cache = strtobool(config_data.get('discord', 'lean_member_cache', fallback='false'))
+email_smtp_host = config_data.get('email', 'smtp_host', fallback='smtp.gmail.com')
+email_smtp_port = config_data.getint('email', 'smtp_port', fallback=465)
+email_smtp_ssl = strtobool(config_data.get('email', 'smtp_ssl', fallback='true'))
+web_server = config_data.get('web', 'server', fallback='eventlet') # 'eventlet' (WSGI) or 'asgi' (uvicorn)
+web_spool = strtobool(config_data.get('web', 'spool', fallback='false')) # Acknowledge /post/user before writing (see spool.py)
+log_max_bytes = config_data.getint('logging', 'max_bytes', fallback=10_000_000) # Size at which a log file is rotated
+log_backup_count = config_data.getint('logging', 'backup_count', fallback=5)     # Rotated log files kept
+log_info_sample_rate = config_data.getfloat('logging', 'info_sample_rate', fallback=1.0) # Share of high-volume info records kept
+supervisor_health_port = config_data.getint('supervisor', 'health_port', fallback=web_port + 1) # GET /health from start.py (0 disables)
+supervisor_heartbeat_timeout = config_data.getfloat('supervisor', 'heartbeat_timeout', fallback=30) # Seconds of silence before a process is restarted
+
+if web_server not in ('eventlet', 'asgi'):
+    print(f'ERROR: Config entry "server" in section "web" must be "eventlet" or "asgi", not "{web_server}"')
+    exit(1)
\ No newline at end of file
@@ -1,61 +1,44 @@
 import csv
 import records
 import os
-import pandas as pd
-import discord
 
 #For all teams in the teamDB, get teamName and all users associated with it
 # TeamData = [Team ID, TeamName, Members...]
+# Teams are read with one grouped query and written to the CSV as they are read,
+# so the export takes one pass over the database and constant memory however many teams there are.
 
 EXPORT_FILENAME = 'team_export.csv'
 
 # ----------- Grab Team Data from DB ------------- #
 def get_team_data():
-    HIGHEST_TEAM_ID = records.get_max_team_id()
-    team_data_list = []
-
-    #Add Header to List
-    headers = ['Team ID', 'Team Name', 'Members...']
-    team_data_list.append(headers)
-
-    for team_id in range(HIGHEST_TEAM_ID):
-        team_data = []
-        #If the team exists
-        if (records.team_exists(team_id)):
-            #Store id and name
-            team_data.append(team_id)
-            team_data.append(records.get_team_name(team_id)) 
-
-            #Look for members TODO: Turn member_id into discord username
-            team_members = records.get_team_members_emails(team_id)
-            for member in team_members:
-                #Clean Email
-                team_data.append(str(member)[2:-3])
-
-            #Append to data list≠
-            team_data_list.append(team_data)
-
-    return team_data_list
+    """ Yields the header row, then one row per active team: [Team ID, Team Name, member emails...] """
+    yield ['Team ID', 'Team Name', 'Members...']
+    for team_id, team_name, member_emails in records.iter_team_member_emails():
+        yield [team_id, team_name, *member_emails]
 
 
 
 # ----------- Export Data to CSV --------------- #
-def export_to_csv(EXPORT_FILENAME:str, data: list):
-    #Remove file if it exists so it can be overwritten
-    if os.path.isfile(EXPORT_FILENAME): os.remove(EXPORT_FILENAME)
-
-    with open(EXPORT_FILENAME, 'w') as csv_file:
-        #Export Header Items
+def export_to_csv(EXPORT_FILENAME:str, data) -> int:
+    """ Writes rows from any iterable to the CSV file, replacing it only once every row is written. Returns the number of rows. """
+    temp_filename = f'{EXPORT_FILENAME}.tmp'
+    num_rows = 0
+    with open(temp_filename, 'w', newline='') as csv_file:
         writer = csv.writer(csv_file)
 
         #Add Rows of Data
         for row in data:
             writer.writerow(row)
-        
-        csv_file.close()
+            num_rows += 1
+
+    os.replace(temp_filename, EXPORT_FILENAME)
+    return num_rows
 
 
 def append_to_xlsx(EXPORT_FILENAME:str, sheets:list[str]):
+    # Only needed for Excel exports, and slow to import
+    import pandas as pd
+
     if os.path.isfile(EXPORT_FILENAME): os.remove(EXPORT_FILENAME)
 
     # Create a new Excel writer object
@@ -71,29 +54,14 @@ def append_to_xlsx(EXPORT_FILENAME:str, sheets:list[str]):
         os.remove(file)
 
 
+if __name__ == "__main__":
+    #Retrieve Data and Compile into CSV
+    sheets = []
 
-
-#Retrieve Data
-team_data_list = get_team_data()
-
-
-#Compile into CSV
-sheets = []
-
-export_to_csv('team_export.csv', team_data_list)
-sheets.append('team_export.csv')
-
-
-#Compile into Excel
-# append_to_xlsx('Report.xlsx', sheets)
-
-
-
-
-
-
-
-
-
+    num_rows = export_to_csv(EXPORT_FILENAME, get_team_data())
+    sheets.append(EXPORT_FILENAME)
+    print(f'Exported {num_rows - 1} teams to {EXPORT_FILENAME}')
 
 
+    #Compile into Excel
+    # append_to_xlsx('Report.xlsx', sheets)
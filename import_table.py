@@ -1,145 +1,338 @@
 """
 Imports the data from the CSV file generated by Qualtrics.
 Any entires already in the database are ignored during the import.
+
+The registration table is read once at the start, each entry is merged into that copy in
+memory, and every new or changed person is written at the end in a single transaction.
+An import only ever adds roles: each person keeps every role they already have, in the database
+or in an earlier entry, plus the ones in this entry. Their name comes from their last entry and
+their capstone status from the participant form.
+
+For very large files, --chunk-size streams the file instead: each chunk of entries is compared
+against just the registrations it mentions and committed on its own, and a checkpoint (byte
+offset and row number) is saved after every commit. Running the same command again after an
+interruption resumes from the checkpoint. Memory use depends on the chunk size, not the file.
+
+Several files (e.g. the participant and volunteer forms) can be imported together. They are read
+in one pass and merged the same way, and the result is written in a single transaction.
+
+USAGE: import_table.py csv_filename [csv_filename ...] [--chunk-size N] [--checkpoint FILE]
 """
-import sys
+import argparse
 import csv
-import records
+import itertools
+import json
+import os
+import sys
 import time
 
+import records
+
 # Be sure to check the Qualtrics forms for what these values should be.
 JUDGE_ROLE_NUM = '1'
 """A string that represents the judge role in the volunteer form's CSV file."""
 MENTOR_ROLE_NUM = '2'
 """A string that represents the mentor role in the volunteer form's CSV file."""
 
-# Variable to keep track of stats for report at the end.
-num_duplicates = 0
-num_error = 0
-num_unfinished = 0
-num_entries = 0
-start_time = time.time()
-
-# Check that the correct number of command line arguments were given.
-try:
-    assert len(sys.argv) == 2
-except AssertionError:
-    print('USAGE: import_table.py [csv_filename]')
-    print('csv_filename: the name of the CSV file to import.')
+# ------------------------- Reading ---------------------------
+
+def fail(message: str):
+    print(f'ERROR: {message}')
     sys.exit(2)
 
-# Print a startup message.
-print(f'Started importing {sys.argv[1]}, please wait...')
+def read_rows(csv_file, offset: int = 0):
+    """
+    Yields (row, byte offset just past the row) for each CSV row of a file opened in binary
+    mode, starting at `offset`. A row may span several lines if a field contains line breaks.
+    """
+    csv_file.seek(offset)
+    position = offset
 
-with open(sys.argv[1], 'r', encoding='utf-8') as csv_file:
-    # Try to open the provided file name.
-    try:
-        assert sys.argv[1].lower().endswith('.csv')
-        reader = csv.DictReader(csv_file, delimiter=',')
-    except AssertionError:
-        print('ERROR: Not a CSV file. Check format and resubmit.')
-        sys.exit(2)
+    def lines():
+        nonlocal position
+        for line in csv_file:
+            position += len(line)
+            yield line.decode('utf-8')
 
-    # Verify that the file has all the attributes we need.
-    try:
-        attributes = set(reader.fieldnames)
-        attributes.remove('Progress')
-        attributes.remove('Email')
-        attributes.remove('First Name')
-        attributes.remove('Last Name')
-    except TypeError:
-        print('ERROR: CSV file not formatted correctly. Check file contents and resubmit.')
-        sys.exit(2)
-    except KeyError:
-        print('ERROR: CSV file missing required attributes. Check file contents and resubmit.')
-        sys.exit(2)
+    # The CSV reader only takes the lines it needs for each row, so `position` is exact
+    for row in csv.reader(lines()):
+        yield row, position
+
+def check_columns(fieldnames: list) -> bool:
+    """ Verifies that the file has all the attributes we need. Returns whether it is the participant form. """
+    attributes = set(fieldnames)
+    if not {'Progress', 'Email', 'First Name', 'Last Name'} <= attributes:
+        fail('CSV file missing required attributes. Check file contents and resubmit.')
 
     # Check if we are importing the participant or volunteer form.
-    is_participant = False
-    try:
-        attributes.remove('Roles')
-    except KeyError:
-        is_participant = True
+    is_participant = 'Roles' not in attributes
 
     # Verify that the participant form has all the attributes we need.
+    if is_participant and 'Capstone Team' not in attributes:
+        fail('CSV file missing required attributes. Check file contents and resubmit.')
+    return is_participant
+
+def read_entries(csv_file) -> tuple:
+    """
+    Reads the column names of a file opened in binary mode.
+    Returns (whether it is the participant form, iterator of entry dicts without the header rows).
+    """
+    rows = read_rows(csv_file)
+    fieldnames = next(rows, ([], 0))[0]
+    is_participant = check_columns(fieldnames)
+
+    def entries():
+        in_header = True
+        for row, _ in rows:
+            entry = dict(itertools.zip_longest(fieldnames, row))
+            if in_header and is_header_row(entry): continue
+            in_header = False
+            yield entry
+
+    return is_participant, entries()
+
+def is_header_row(entry: dict) -> bool:
+    """
+    Qualtrics puts two more header rows (question text and import IDs) under the column names.
+    Neither has a number in the Progress column.
+    """
+    return not str(entry['Progress']).isdigit()
+
+def parse_entry(entry: dict, is_participant: bool, stats: dict) -> tuple:
+    """ Returns the registration tuple for an entry, or None (counted in `stats`) if it can't be imported. """
+    # Check that the entry is for a completed response.
+    if entry['Progress'] != '100':
+        stats['unfinished'] += 1
+        return None
+
+    # Check for and store the entry's email.
+    email = records.normalize_email(entry['Email'] or '')
+    if not email:
+        stats['error'] += 1
+        return None
+
+    # If this person is a participant, check if they are on a capstone team.
+    is_capstone = entry['Capstone Team'] == 'Yes' if is_participant else False
+
+    # Check for and store the entry's roles.
+    roles = []
+    if is_participant:
+        roles.append('participant')
+    else:
+        # If the roles attribute exists but is blank, skip this entry.
+        if not entry['Roles']:
+            stats['error'] += 1
+            return None
+        # Add appropriate roles for the volunteer form.
+        if JUDGE_ROLE_NUM in entry['Roles']:
+            roles.append('judge')
+        if MENTOR_ROLE_NUM in entry['Roles']:
+            roles.append('mentor')
+
+    return (email, entry['First Name'], entry['Last Name'], is_capstone, roles)
+
+# ------------------------- Comparing -------------------------
+
+def snapshot(rows: list) -> dict:
+    """ Converts registration rows to email -> (first name, last name, is capstone, roles). """
+    current = {}
+    for row in rows:
+        roles = {role for role in ('participant', 'judge', 'mentor') if row[f'is_{role}']}
+        current[row['email']] = (row['first_name'], row['last_name'], bool(row['is_capstone']), roles)
+    return current
+
+def merge_registration(registration: tuple, is_participant: bool, current: dict, changes: dict, stats: dict):
+    """
+    Merges an entry into `current` and queues the person's merged registration in `changes`,
+    or counts the entry as a duplicate if it changes nothing.
+    """
+    email, first_name, last_name, is_capstone, roles = registration
+    old_is_capstone, old_roles = current[email][2:] if email in current else (False, set())
+
+    # Add roles rather than replace them, and only take capstone status from the participant form.
+    merged = (first_name, last_name, is_capstone if is_participant else old_is_capstone, old_roles | set(roles))
+    if current.get(email) == merged:
+        stats['duplicates'] += 1
+        return
+
+    current[email] = merged
+    changes[email] = (email, first_name, last_name, merged[2], sorted(merged[3]))
+
+def new_stats() -> dict:
+    return {'entries': 0, 'duplicates': 0, 'error': 0, 'unfinished': 0}
+
+# ------------------------- Importing -------------------------
+
+def import_files(filenames: list) -> tuple:
+    """
+    Imports one or more files in one pass and one transaction, merging each person's entries.
+    Returns (stats for each file, stats for the people imported, seconds taken).
+    """
+    start_time = time.time()
+    current = snapshot(records.get_all_registrants())
+    original = dict(current)
+    changes = {}
+    num_files = {} # email -> number of files the person is in
+    file_stats = {}
+
+    for filename in filenames:
+        stats = new_stats()
+        people = set()
+        with open(filename, 'rb') as csv_file:
+            is_participant, entries = read_entries(csv_file)
+            for entry in entries:
+                stats['entries'] += 1
+                registration = parse_entry(entry, is_participant, stats)
+                if registration:
+                    merge_registration(registration, is_participant, current, changes, stats)
+                    people.add(registration[0])
+        for email in people:
+            num_files[email] = num_files.get(email, 0) + 1
+        file_stats[filename] = stats
+
+    # Write every person who ends up new or changed in one transaction.
+    changes = {email: registration for email, registration in changes.items() if current[email] != original.get(email)}
+    records.add_registrations(list(changes.values()))
+
+    added = sum(1 for email in changes if email not in original)
+    people_stats = {
+        'people': len(num_files),
+        'multiple_files': sum(1 for count in num_files.values() if count > 1),
+        'added': added,
+        'updated': len(changes) - added,
+        'unchanged': len(num_files) - len(changes),
+    }
+    return file_stats, people_stats, time.time() - start_time
+
+def load_checkpoint(checkpoint_file: str, filename: str) -> dict:
+    """ Returns the saved checkpoint for `filename`, or None if there isn't one or the file has changed since. """
     try:
-        if is_participant:
-            attributes.remove('Capstone Team')
-    except KeyError:
-        print('ERROR: CSV file missing required attributes. Check file contents and resubmit.')
-        sys.exit(2)
-
-    # For each entry in the CSV file...
-    for entry in reader:
-        num_entries = num_entries + 1
-
-        # Check that the entry is for a completed response.
-        if entry['Progress'] != '100':
-            num_unfinished = num_unfinished + 1
-            continue
-
-        # Check for and store the entry's email.
-        if entry['Email'] == '':
-            num_error = num_error + 1
-            continue
-        email = entry['Email'].replace(' ', '').lower()
-
-        # If this person is a participant, check if they are on a capstone team.
-        is_capstone = entry['Capstone Team'] == 'Yes' if is_participant else False
-
-        # Check for and store the entry's roles.
-        roles = []
-        if is_participant:
-            roles.append('participant')
-        else:
-            # If the roles attribute exists but is blank, skip this entry.
-            if entry['Roles'] == '':
-                num_error = num_error + 1
-                continue
-            # Add appropriate roles for the volunteer form.
-            if JUDGE_ROLE_NUM in entry['Roles']:
-                roles.append('judge')
-            if MENTOR_ROLE_NUM in entry['Roles']:
-                roles.append('mentor')
-
-        # Add this entry's data to the database if it is not a duplicate.
-        if records.is_registered(email):
-            # Get the existing version of this entry's data.
-            old_data = records.get_registration(email)
-
-            # Check if the names are the same.
-            is_duplicate = old_data['first_name'] == entry['First Name']
-            is_duplicate = is_duplicate and old_data['last_name'] == entry['Last Name']
-
-            # Check if the capstone team status is the same.
-            if is_participant:
-                is_duplicate = is_duplicate and old_data['is_capstone'] == (entry['Capstone Team'] == 'Yes')
-
-            # Check if the roles are the same.
-            is_duplicate = is_duplicate and set(records.get_user_roles(email)) == set(roles)
-
-            # If this entry is not a duplicate, add it.
-            if not is_duplicate:
-                records.add_registration(email, entry['First Name'], entry['Last Name'], is_capstone, roles)
-            else:
-                num_duplicates = num_duplicates + 1
-        else:
-            # If this entry is not in the database, add it.
-            records.add_registration(email, entry['First Name'], entry['Last Name'], is_capstone, roles)
-
-# There are essentially three header rows in the CSV file generated by Qualtrics.
-# One header row is the actual header row, and the other two rows are treated as entries
-# by the CSV reader. As such, subtract two from the relevant totals.
-num_entries = num_entries - 2
-num_unfinished = num_unfinished - 2
-
-# Output statistics to help with any troubleshooting that may come up.
-print(f'Finished importing {sys.argv[1]}')
-print(f'Processing time: {time.time() - start_time:.3f} seconds')
-print(f'Total number of entries processed: {num_entries}')
-print(f'-----------------------------------------')
-print(f'Number of entries added to database:', end=' ')
-print(f'{num_entries - num_duplicates - num_error - num_unfinished} out of {num_entries}')
-print(f'Number of duplicate entries: {num_duplicates} out of {num_entries}')
-print(f'Number of entries with incomplete information: {num_error} out of {num_entries}')
-print(f'Number of unfinished entries: {num_unfinished} out of {num_entries}')
+        with open(checkpoint_file) as file:
+            checkpoint = json.load(file)
+    except FileNotFoundError:
+        return None
+
+    file_stat = os.stat(filename)
+    if checkpoint['file'] != os.path.abspath(filename) or checkpoint['size'] != file_stat.st_size or checkpoint['mtime'] != file_stat.st_mtime:
+        print(f'{checkpoint_file} is for a different or changed file, starting from the beginning.')
+        return None
+    return checkpoint
+
+def save_checkpoint(checkpoint_file: str, checkpoint: dict):
+    temp_file = f'{checkpoint_file}.tmp'
+    with open(temp_file, 'w') as file:
+        json.dump(checkpoint, file)
+    os.replace(temp_file, checkpoint_file)
+
+def import_file_chunked(filename: str, chunk_size: int, checkpoint_file: str) -> tuple:
+    """
+    Imports the file `chunk_size` rows per transaction, saving a checkpoint after each.
+    A chunk interrupted before its checkpoint is imported again on resume, which is harmless
+    since it writes the same data. Returns (stats, seconds taken), including any earlier runs.
+    """
+    file_stat = os.stat(filename)
+    checkpoint = load_checkpoint(checkpoint_file, filename)
+    if checkpoint:
+        print(f'Resuming from row {checkpoint["row"]} (byte {checkpoint["offset"]}).')
+    else:
+        checkpoint = {'file': os.path.abspath(filename), 'size': file_stat.st_size, 'mtime': file_stat.st_mtime,
+                      'offset': 0, 'row': 0, 'stats': new_stats(), 'elapsed': 0.0}
+    stats = checkpoint['stats']
+    run_start = time.time() - checkpoint['elapsed']
+
+    with open(filename, 'rb') as csv_file:
+        fieldnames, header_end = next(read_rows(csv_file), ([], 0))
+        is_participant = check_columns(fieldnames)
+
+        in_header = checkpoint['row'] == 0
+        rows = read_rows(csv_file, checkpoint['offset'] or header_end)
+
+        while True:
+            # Read the next chunk, comparing it against only the registrations it mentions
+            chunk = []
+            offset = checkpoint['offset']
+            row_num = checkpoint['row']
+            for row, offset in rows:
+                row_num += 1
+                entry = dict(itertools.zip_longest(fieldnames, row))
+                if in_header and is_header_row(entry): continue
+                in_header = False
+
+                stats['entries'] += 1
+                registration = parse_entry(entry, is_participant, stats)
+                if registration: chunk.append(registration)
+                if row_num - checkpoint['row'] >= chunk_size: break
+            if row_num == checkpoint['row']: break
+
+            current = snapshot(records.get_registrations({registration[0] for registration in chunk}))
+            changes = {}
+            for registration in chunk:
+                merge_registration(registration, is_participant, current, changes, stats)
+            records.add_registrations(list(changes.values()))
+
+            checkpoint.update(offset=offset, row=row_num, elapsed=time.time() - run_start)
+            save_checkpoint(checkpoint_file, checkpoint)
+            print(f'Imported {row_num} rows ({offset / max(file_stat.st_size, 1):.0%} of the file)', flush=True)
+
+    if os.path.exists(checkpoint_file): os.remove(checkpoint_file)
+    return stats, time.time() - run_start
+
+# ------------------------- Main -------------------------------
+
+def print_file_stats(filename: str, stats: dict):
+    num_entries = stats['entries']
+    num_duplicates = stats['duplicates']
+    num_error = stats['error']
+    num_unfinished = stats['unfinished']
+
+    print(f'-----------------------------------------')
+    print(f'{filename}: {num_entries} entries processed')
+    print(f'Number of entries added to database:', end=' ')
+    print(f'{num_entries - num_duplicates - num_error - num_unfinished} out of {num_entries}')
+    print(f'Number of duplicate entries: {num_duplicates} out of {num_entries}')
+    print(f'Number of entries with incomplete information: {num_error} out of {num_entries}')
+    print(f'Number of unfinished entries: {num_unfinished} out of {num_entries}')
+
+def main():
+    parser = argparse.ArgumentParser(description='Imports CSV files exported from Qualtrics into the registration table.')
+    parser.add_argument('csv_filenames', nargs='+', metavar='csv_filename', help='the name of a CSV file to import')
+    parser.add_argument('--chunk-size', type=int, help='stream the file, committing and saving a checkpoint every CHUNK_SIZE rows')
+    parser.add_argument('--checkpoint', help='checkpoint file for --chunk-size (default: csv_filename.checkpoint)')
+    args = parser.parse_args()
+
+    for csv_filename in args.csv_filenames:
+        if not csv_filename.lower().endswith('.csv'):
+            fail(f'{csv_filename} is not a CSV file. Check format and resubmit.')
+    if args.chunk_size is not None and args.chunk_size < 1:
+        fail('--chunk-size must be at least 1.')
+    if args.chunk_size and len(args.csv_filenames) > 1:
+        fail('--chunk-size imports one file at a time.')
+
+    # Print a startup message.
+    print(f'Started importing {", ".join(args.csv_filenames)}, please wait...')
+
+    if args.chunk_size:
+        csv_filename = args.csv_filenames[0]
+        stats, elapsed = import_file_chunked(csv_filename, args.chunk_size, args.checkpoint or f'{csv_filename}.checkpoint')
+        file_stats, people_stats = {csv_filename: stats}, None
+    else:
+        file_stats, people_stats, elapsed = import_files(args.csv_filenames)
+    num_entries = sum(stats['entries'] for stats in file_stats.values())
+
+    # Output statistics to help with any troubleshooting that may come up.
+    print(f'Finished importing {", ".join(args.csv_filenames)}')
+    print(f'Processing time: {elapsed:.3f} seconds ({num_entries / elapsed if elapsed else 0:.0f} rows/second)')
+    for filename, stats in file_stats.items():
+        print_file_stats(filename, stats)
+
+    if people_stats:
+        people = people_stats['people']
+        print(f'-----------------------------------------')
+        if len(args.csv_filenames) > 1:
+            print(f'Number of people in more than one file: {people_stats["multiple_files"]} out of {people}')
+        print(f'Number of people added to database: {people_stats["added"]} out of {people}')
+        print(f'Number of people updated: {people_stats["updated"]} out of {people}')
+        print(f'Number of people already up to date: {people_stats["unchanged"]} out of {people}')
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import asyncio
+import json
+import logging
+
+import records
+
+'''
+Durable background jobs.
+
+Bulk admin work (broadcasts, tearing down every team, role resyncs) is queued in the jobs
+table of records.db and run one job at a time by a JobWorker on the bot's event loop, so
+the slash command that queued it can answer straight away.
+
+Handlers save their progress with a checkpoint as they go. If the bot stops part way
+through a job, the job is queued again on the next start and its handler is given the last
+checkpoint to resume from. Work done after the last checkpoint may be repeated, so handlers
+should checkpoint after each step that must not run twice.
+'''
+
+logger = logging.getLogger(__name__)
+
+class Job:
+    """ A claimed job, as passed to its handler. """
+
+    def __init__(self, row: dict):
+        self.id = row['id']
+        self.kind = row['kind']
+        self.payload = json.loads(row['payload'])
+        self.checkpoint = json.loads(row['checkpoint']) if row['checkpoint'] else None
+        self.progress = row['progress']
+        self.total = row['total']
+        self.created_by = row['created_by']
+
+    def save_progress(self, progress: int, total: int = None, checkpoint=None):
+        """
+        Records how far the job has got.
+
+        Args:
+            progress (int): Units of work done so far, shown by /jobs.
+            total (int): Total units of work, if known.
+            checkpoint: Any JSON value; handed back in `job.checkpoint` if the job is resumed.
+        """
+        self.progress = progress
+        if total is not None: self.total = total
+        self.checkpoint = checkpoint
+        records.update_job_progress(self.id, progress, self.total, json.dumps(checkpoint) if checkpoint is not None else None)
+
+class JobWorker:
+
+    def __init__(self, poll_interval: float = 5):
+        """
+        Args:
+            poll_interval (float): Seconds between checks for jobs queued by another process.
+        """
+        self.poll_interval = poll_interval
+        self.handlers = {}  # kind -> async handler(job) returning a summary string
+        self.on_finish = None  # Optional async callback(job, status, result) run after each job
+
+        self._wakeup = None
+        self._task = None
+
+    def register(self, kind: str, handler):
+        """ Sets the coroutine function that runs jobs of the given kind. """
+        self.handlers[kind] = handler
+
+    def enqueue(self, kind: str, payload: dict, created_by: int = None) -> int:
+        """ Queues a job and returns its ID. """
+        job_id = records.add_job(kind, json.dumps(payload), created_by)
+        if self._wakeup: self._wakeup.set()
+        return job_id
+
+    def start(self):
+        """ Requeues jobs interrupted by a restart and starts working. Must be called from the event loop. """
+        if self._task: return
+        resumed = records.requeue_running_jobs()
+        if resumed: logger.warning(f"Resuming {resumed} interrupted job(s)")
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            row = records.claim_next_job()
+            if not row:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            job = Job(row)
+            try:
+                handler = self.handlers.get(job.kind)
+                if not handler: raise ValueError(f"No handler for job kind '{job.kind}'")
+                status, result = 'done', await handler(job)
+            except Exception as e:
+                logger.exception(f"Job {job.id} ({job.kind}) failed: {e}")
+                status, result = 'failed', str(e)
+            records.finish_job(job.id, status, result)
+
+            if self.on_finish:
+                try:
+                    await self.on_finish(job, status, result)
+                except Exception as e:
+                    logger.error(f"Could not report the end of job {job.id}: {e}")
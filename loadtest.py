@@ -0,0 +1,291 @@
+"""
+Rehearses the opening ceremony verification rush without Discord or Gmail.
+
+Simulated users each run `/verify <email>`, read their code from a local SMTP sink, and
+then run `/verify <code>`, all against the real `verify` handler in bot.py. The handler
+talks to a fake guild/interaction layer (with a configurable simulated Discord latency)
+and a throwaway copy of the database.
+
+USAGE: loadtest.py [--users N] [--discord-latency SECONDS] [--timeout SECONDS]
+"""
+import argparse
+import asyncio
+import email
+import os
+import re
+import statistics
+import tempfile
+import threading
+import time
+
+import config
+
+# Use a throwaway database so the real records.db is never touched. records.py opens its
+# database as soon as it is imported, so the path has to be set before bot.py imports it.
+_temp_dir = tempfile.TemporaryDirectory()
+os.environ['RECORDS_DB'] = os.path.join(_temp_dir.name, 'loadtest.db')
+
+import records
+import bot
+
+# ------------------------- SMTP Sink -------------------------
+
+class SMTPSink:
+    """ A minimal SMTP server on localhost that keeps every message it receives. """
+
+    def __init__(self):
+        self.port = None
+        self._codes = {}    # recipient -> latest verification code
+        self._waiters = {}  # recipient -> (event loop, future) of a harness task waiting for a code
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+
+    def start(self):
+        """ Starts the server on its own thread (bot.py's smtplib calls block the bot's event loop). """
+        threading.Thread(target=asyncio.run, args=(self._serve(),), name="smtp-sink", daemon=True).start()
+        self._ready.wait()
+
+    async def _serve(self):
+        server = await asyncio.start_server(self._handle, '127.0.0.1', 0)
+        self.port = server.sockets[0].getsockname()[1]
+        self._ready.set()
+        async with server:
+            await server.serve_forever()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        recipients = []
+        writer.write(b"220 localhost SMTP sink\r\n")
+        while line := await reader.readline():
+            command = line.decode().strip().upper()
+            if command.startswith(("EHLO", "HELO")):
+                writer.write(b"250-localhost\r\n250 AUTH PLAIN\r\n")
+            elif command.startswith("AUTH"):
+                writer.write(b"235 Authentication successful\r\n")
+            elif command.startswith("RCPT TO:"):
+                recipients.append(line.decode().strip()[8:].strip(" <>").lower())
+                writer.write(b"250 OK\r\n")
+            elif command == "DATA":
+                writer.write(b"354 End data with <CR><LF>.<CR><LF>\r\n")
+                await writer.drain()
+                data = await reader.readuntil(b"\r\n.\r\n")
+                self._store(recipients, data.decode(errors='replace'))
+                recipients = []
+                writer.write(b"250 OK\r\n")
+            elif command == "QUIT":
+                writer.write(b"221 Bye\r\n")
+                break
+            else: # MAIL FROM, RSET, NOOP
+                writer.write(b"250 OK\r\n")
+            await writer.drain()
+        writer.close()
+
+    def _store(self, recipients: list, data: str):
+        # Drop the terminating "." line and undo dot-stuffing before parsing the message
+        lines = data.split("\r\n")[:-2]
+        message = email.message_from_string("\r\n".join(line[1:] if line.startswith(".") else line for line in lines))
+        body = message.get_payload(decode=True).decode(errors='replace')
+
+        match = re.search(r"<h3>(\d+)</h3>", body)
+        if not match: return
+        with self._lock:
+            for recipient in recipients:
+                self._codes[recipient] = match.group(1)
+                if recipient in self._waiters:
+                    loop, future = self._waiters.pop(recipient)
+                    loop.call_soon_threadsafe(lambda f=future, code=match.group(1): f.done() or f.set_result(code))
+
+    async def wait_for_code(self, recipient: str, timeout: float) -> str:
+        """ Waits until a code has been sent to `recipient`. Returns None on timeout. """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if recipient in self._codes:
+                return self._codes[recipient]
+            future = loop.create_future()
+            self._waiters[recipient] = (loop, future)
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            return None
+
+# ------------------- Fake Discord Layer ----------------------
+
+class FakeRole:
+    def __init__(self, role_id: int, name: str):
+        self.id = role_id
+        self.name = name
+        self.mention = f"<@&{role_id}>"
+
+class FakeChannel:
+    def __init__(self, channel_id: int, name: str):
+        self.id = channel_id
+        self.name = name
+        self.mention = f"<#{channel_id}>"
+
+class FakeGuild:
+    def __init__(self, latency: float):
+        self.id = config.discord_guild_id
+        self.latency = latency
+        self.api_calls = 0
+        self.roles = {role_id: FakeRole(role_id, name) for name, role_id in bot.index_role_map.items()}
+        self.channels = {channel_id: FakeChannel(channel_id, name) for name, channel_id in bot.index_channel_map.items()}
+        self.members = {}
+
+    async def api_call(self):
+        """ Simulates the round trip of one Discord API request. """
+        self.api_calls += 1
+        await asyncio.sleep(self.latency)
+
+    def get_role(self, role_id: int): return self.roles.get(role_id)
+    def get_channel(self, channel_id: int): return self.channels.get(channel_id)
+    def get_member(self, member_id: int): return self.members.get(member_id)
+
+class FakeMember:
+    def __init__(self, guild: FakeGuild, member_id: int, name: str):
+        self.guild = guild
+        self.id = member_id
+        self.name = name
+        self.mention = f"<@{member_id}>"
+        self.roles = []
+        guild.members[member_id] = self
+
+    async def add_roles(self, *roles, reason=None):
+        await self.guild.api_call()
+        self.roles += [role for role in roles if role not in self.roles]
+
+    async def remove_roles(self, *roles, reason=None):
+        await self.guild.api_call()
+        self.roles = [role for role in self.roles if role not in roles]
+
+class FakeResponse:
+    def __init__(self, interaction):
+        self._interaction = interaction
+
+    async def defer(self, ephemeral=False, thinking=False):
+        await self._interaction.guild.api_call()
+
+    async def send_message(self, content=None, **kwargs):
+        await self._interaction.guild.api_call()
+        self._interaction.reply(content, kwargs.get('embed'))
+
+class FakeFollowup:
+    def __init__(self, interaction):
+        self._interaction = interaction
+
+    async def send(self, content=None, **kwargs):
+        await self._interaction.guild.api_call()
+        self._interaction.reply(content, kwargs.get('embed'))
+
+class FakeInteraction:
+    """ Stands in for discord.Interaction; `replied` is set once the handler first answers. """
+
+    def __init__(self, guild: FakeGuild, user: FakeMember):
+        self.guild = guild
+        self.user = user
+        self.extras = {}
+        self.response = FakeResponse(self)
+        self.followup = FakeFollowup(self)
+        self.replied = asyncio.Event()
+        self.content = None
+
+    def reply(self, content, embed):
+        if self.replied.is_set(): return
+        self.content = content if content is not None else getattr(embed, 'description', '')
+        self.replied.set()
+
+# ------------------------- Harness ---------------------------
+
+async def run_command(guild: FakeGuild, member: FakeMember, argument: str, timeout: float, tasks: list) -> tuple:
+    """ Runs `/verify <argument>` and returns (seconds until the first reply, reply text). """
+    interaction = FakeInteraction(guild, member)
+    start = time.perf_counter()
+
+    # Only the first reply counts, so don't wait for verify to return
+    tasks.append(asyncio.create_task(bot.verify.callback(interaction, argument)))
+    await asyncio.wait_for(interaction.replied.wait(), timeout)
+    return time.perf_counter() - start, interaction.content
+
+async def simulate_user(guild: FakeGuild, sink: SMTPSink, user_num: int, timeout: float, results: dict, tasks: list):
+    member = FakeMember(guild, 10_000 + user_num, f"loadtest{user_num}")
+    email = f"loadtest{user_num}@example.com"
+    try:
+        # Step 1: Request a code, waiting and retrying like a real user if told to
+        while True:
+            latency, content = await run_command(guild, member, email, timeout, tasks)
+            results['email_latency'].append(latency)
+            throttled = re.search(r"try again in (\d+) seconds", content)
+            if not throttled: break
+            results['throttled'] += 1
+            await asyncio.sleep(int(throttled.group(1)))
+        code = await sink.wait_for_code(email, timeout)
+        if not code:
+            results['failures']['no code received'] = results['failures'].get('no code received', 0) + 1
+            return
+
+        # Step 2: Enter the code
+        latency, content = await run_command(guild, member, code, timeout, tasks)
+        results['code_latency'].append(latency)
+        if "You have been verified" not in content:
+            results['failures']['code rejected'] = results['failures'].get('code rejected', 0) + 1
+            return
+        results['verified'] += 1
+    except asyncio.TimeoutError:
+        results['failures']['timed out'] = results['failures'].get('timed out', 0) + 1
+
+def percentile(values: list, pct: float) -> float:
+    if not values: return float('nan')
+    return statistics.quantiles(values, n=100, method='inclusive')[pct - 1] if len(values) > 1 else values[0]
+
+async def run(num_users: int, latency: float, timeout: float) -> dict:
+    sink = SMTPSink()
+    sink.start()
+    config.email_smtp_host = '127.0.0.1'
+    config.email_smtp_port = sink.port
+    config.email_smtp_ssl = False
+
+    # Everyone in the rush is registered but not yet verified
+    for user_num in range(num_users):
+        records.add_registration(f"loadtest{user_num}@example.com", "Load", f"Test{user_num}", False, ['participant'])
+
+    guild = FakeGuild(latency)
+    bot.guild_index.build(guild, bot.index_role_map, bot.index_channel_map, [], {})
+
+    results = {'verified': 0, 'throttled': 0, 'email_latency': [], 'code_latency': [], 'failures': {}}
+    tasks = []
+    start = time.perf_counter()
+    await asyncio.gather(*(simulate_user(guild, sink, user_num, timeout, results, tasks) for user_num in range(num_users)))
+    results['elapsed'] = time.perf_counter() - start
+    results['api_calls'] = guild.api_calls
+
+    for task in tasks: task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the /verify command offline.")
+    parser.add_argument('--users', type=int, default=100, help="number of simulated users (default: 100)")
+    parser.add_argument('--discord-latency', type=float, default=0.05, help="simulated seconds per Discord API request (default: 0.05)")
+    parser.add_argument('--timeout', type=float, default=60, help="seconds to wait for each reply or code (default: 60)")
+    args = parser.parse_args()
+
+    print(f'Simulating {args.users} users verifying at once, please wait...')
+    try:
+        results = asyncio.run(run(args.users, args.discord_latency, args.timeout))
+    finally:
+        _temp_dir.cleanup()
+
+    print(f'Finished in {results["elapsed"]:.3f} seconds')
+    print(f'-----------------------------------------')
+    print(f'Users verified: {results["verified"]} out of {args.users}')
+    print(f'Throughput: {results["verified"] / results["elapsed"]:.2f} verifications/second')
+    print(f'Simulated Discord API requests: {results["api_calls"]}')
+    print(f'Requests told to wait by the email rate limits: {results["throttled"]}')
+    for step, key in (('/verify <email>', 'email_latency'), ('/verify <code>', 'code_latency')):
+        values = results[key]
+        print(f'{step:>16} latency: p50 {percentile(values, 50) * 1000:.0f} ms, '
+              f'p90 {percentile(values, 90) * 1000:.0f} ms, p99 {percentile(values, 99) * 1000:.0f} ms '
+              f'({len(values)} replies)')
+    print(f'Failures: {sum(results["failures"].values())}', end=' ')
+    print(', '.join(f'({reason}: {count})' for reason, count in results['failures'].items()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import json
+import logging
+import logging.handlers
+import queue
+import random
+
+import config
+
+'''
+Non-blocking logging shared by the bot and web processes (see start.py).
+
+setup_logging() points the root logger at a QueueHandler, so logging a record only puts it
+on an in-memory queue. A QueueListener thread takes records off the queue and writes them to
+a rotating log file (one JSON object per line) and to the console.
+A slow disk then delays the listener thread instead of the bot's event loop or a web request.
+
+Usage:
+    logger = logging.getLogger(__name__)
+    logger.info("User registered", extra={'fields': {'email': email}})  # structured fields
+    logger.info("Repeat delivery", extra={'sample': True})             # high-volume, sampled
+
+Info records marked with 'sample' are kept at the configured sample rate; everything else
+is always kept.
+'''
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats each record as one line of JSON, including any `fields` passed in `extra`.
+    (QueueHandler has already added any traceback to the message.)
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            **getattr(record, 'fields', {})
+        }
+        return json.dumps(entry, default=str)
+
+class SamplingFilter(logging.Filter):
+    """ Keeps only `rate` (0 to 1) of the info records marked with extra={'sample': True}. """
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno == logging.INFO and getattr(record, 'sample', False):
+            return random.random() < self.rate
+        return True
+
+def setup_logging(filename: str, console_level: int = logging.WARNING) -> logging.handlers.QueueListener:
+    """
+    Sends every log record in this process through a queue to `filename` (rotated) and, from
+    `console_level` up, to the console. Call once per process, before anything is logged.
+
+    Returns the listener, which the caller must stop (in a `finally`) before the process ends
+    to write the records still queued. atexit can't do it: multiprocessing children exit
+    through os._exit, which skips it.
+    """
+    file_handler = logging.handlers.RotatingFileHandler(filename, maxBytes=config.log_max_bytes, backupCount=config.log_backup_count)
+    file_handler.setFormatter(JsonFormatter())
+
+    console_handler = logging.StreamHandler()
+    console_handler.setLevel(console_level)
+    console_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+
+    # Sample before queueing, so dropped records cost nothing more
+    queue_handler = logging.handlers.QueueHandler(queue.SimpleQueue())
+    queue_handler.addFilter(SamplingFilter(config.log_info_sample_rate))
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(logging.INFO)
+
+    listener = logging.handlers.QueueListener(queue_handler.queue, file_handler, console_handler, respect_handler_level=True)
+    listener.start()
+    return listener
@@ -0,0 +1,130 @@
+import asyncio
+import collections
+import sys
+import threading
+import time
+import traceback
+
+'''
+Event loop lag watchdog.
+
+A heartbeat task on the event loop sleeps for a fixed interval and records how late it
+woke up (the scheduling lag). A separate thread watches the heartbeat; if the loop hasn't
+come back within the threshold, something is blocking it, so the thread samples the loop
+thread's stack and works out which registered handler (slash command or event) is running.
+
+Lag samples are kept for a rolling window so they can be summarised as a histogram.
+'''
+
+# Upper bounds (seconds) of the histogram buckets. Anything slower falls in the last bucket.
+LAG_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 5)
+
+class LoopMonitor:
+
+    def __init__(self, interval: float = 0.5, threshold: float = 0.25, window: float = 3600, max_stalls: int = 20):
+        """
+        Args:
+            interval (float): Seconds between heartbeats.
+            threshold (float): Lag in seconds that counts as a stall.
+            window (float): Seconds of lag samples kept for the histogram.
+            max_stalls (int): Number of recent stalls kept.
+        """
+        self.interval = interval
+        self.threshold = threshold
+        self.window = window
+
+        self._handlers = {}  # code object -> handler name
+        self._samples = collections.deque()  # (timestamp, lag)
+        self._stalls = collections.deque(maxlen=max_stalls)
+        self._lock = threading.Lock()
+
+        self._beat = None
+        self._loop_thread_id = None
+        self._pending_stall = None
+        self._task = None
+
+    def register_handler(self, name: str, func):
+        """ Marks a coroutine function as a handler, so stalls inside it are attributed to `name`. """
+        self._handlers[func.__code__] = name
+
+    def start(self):
+        """ Starts the heartbeat task and the watchdog thread. Must be called from the event loop. """
+        if self._task: return
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._task = asyncio.get_running_loop().create_task(self._heartbeat())
+        threading.Thread(target=self._watch, name="loop-monitor", daemon=True).start()
+
+    # ------------------------- Measuring -------------------------
+
+    async def _heartbeat(self):
+        while True:
+            before = time.monotonic()
+            await asyncio.sleep(self.interval)
+            self._beat = time.monotonic()
+            self._record(max(0.0, self._beat - before - self.interval))
+
+    def _record(self, lag: float):
+        now = time.time()
+        with self._lock:
+            self._samples.append((now, lag))
+            while self._samples and self._samples[0][0] < now - self.window:
+                self._samples.popleft()
+
+            # Close the stall the watchdog thread opened, or log one it was too slow to see
+            if self._pending_stall:
+                self._pending_stall['lag'] = lag
+                self._pending_stall = None
+            elif lag >= self.threshold:
+                self._stalls.append({'time': now, 'lag': lag, 'handler': None, 'stack': None})
+
+    def _watch(self):
+        while True:
+            time.sleep(self.threshold / 4)
+            if self._pending_stall or time.monotonic() - self._beat < self.interval + self.threshold:
+                continue
+
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None: continue
+            stall = {
+                'time': time.time(),
+                'lag': None,
+                'handler': self._find_handler(frame),
+                'stack': ''.join(traceback.format_stack(frame, limit=15))
+            }
+            with self._lock:
+                self._stalls.append(stall)
+                self._pending_stall = stall
+
+    def _find_handler(self, frame) -> str:
+        while frame is not None:
+            if frame.f_code in self._handlers:
+                return self._handlers[frame.f_code]
+            frame = frame.f_back
+        return None
+
+    # ------------------------- Reporting -------------------------
+
+    def histogram(self) -> list:
+        """ Returns [(bucket upper bound or None for the overflow bucket, count), ...] for the window. """
+        counts = [0] * (len(LAG_BUCKETS) + 1)
+        with self._lock:
+            samples = list(self._samples)
+        for _, lag in samples:
+            for i, bound in enumerate(LAG_BUCKETS):
+                if lag < bound:
+                    counts[i] += 1
+                    break
+            else:
+                counts[-1] += 1
+        return list(zip([*LAG_BUCKETS, None], counts))
+
+    def max_lag(self) -> float:
+        """ Returns the largest lag in the window, in seconds. """
+        with self._lock:
+            return max((lag for _, lag in self._samples), default=0.0)
+
+    def stalls(self) -> list:
+        """ Returns the most recent stalls, newest first. """
+        with self._lock:
+            return [dict(stall) for stall in reversed(self._stalls)]
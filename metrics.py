@@ -0,0 +1,174 @@
+import bisect
+import contextvars
+import functools
+import os
+import threading
+import time
+import types
+
+'''
+Latency histograms (and a few gauges) in the Prometheus text format.
+
+The bot and web server run in separate processes (see start.py). Each keeps its own
+histograms; the bot periodically writes its metrics to BOT_METRICS_FILE, and web.py serves
+them together with its own on /metrics.
+
+Slash command timing: the bot starts a CommandTiming when an interaction arrives and sets it
+as the current timing. Functions wrapped by instrument_module() (records.py) add their time
+to its 'db' total, and timed_request() (discord.py's HTTP client) adds to 'api' and notes
+when the interaction was first acknowledged.
+'''
+
+BOT_METRICS_FILE = 'bot_metrics.prom'
+
+# Upper bounds of the latency buckets, in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+class Histogram:
+
+    def __init__(self, name: str, description: str, label_names: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values):
+        """ Records one observation for the given label values. """
+        with self._lock:
+            # One count per bucket plus the +Inf bucket, then the sum and total count
+            series = self._series.setdefault(label_values, [0] * (len(self.buckets) + 3))
+            series[bisect.bisect_left(self.buckets, value)] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> str:
+        """ Returns the histogram in the Prometheus text exposition format. """
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {labels: list(values) for labels, values in self._series.items()}
+        for label_values, values in sorted(series.items()):
+            labels = [f'{name}="{value}"' for name, value in zip(self.label_names, label_values)]
+            cumulative = 0
+            for bound, count in zip([*self.buckets, None], values):
+                cumulative += count
+                bucket_labels = ','.join([*labels, f'le="{bound:g}"' if bound else 'le="+Inf"'])
+                lines.append(f"{self.name}_bucket{{{bucket_labels}}} {cumulative}")
+            suffix = f"{{{','.join(labels)}}}" if labels else ""
+            lines.append(f"{self.name}_sum{suffix} {values[-2]:.6f}")
+            lines.append(f"{self.name}_count{suffix} {values[-1]}")
+        return "\n".join(lines) + "\n"
+
+class Gauge:
+    """ A single value, read from a callback whenever metrics are rendered. """
+
+    def __init__(self, name: str, description: str, read):
+        self.name = name
+        self.description = description
+        self.read = read
+
+    def render(self) -> str:
+        return f"# HELP {self.name} {self.description}\n# TYPE {self.name} gauge\n{self.name} {self.read():g}\n"
+
+class Registry:
+
+    def __init__(self):
+        self._metrics = []
+
+    def histogram(self, name: str, description: str, label_names: tuple = (), buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        """ Creates and registers a new histogram. """
+        histogram = Histogram(name, description, label_names, buckets)
+        self._metrics.append(histogram)
+        return histogram
+
+    def gauge(self, name: str, description: str, read) -> Gauge:
+        """ Creates and registers a new gauge whose value is `read()`. """
+        gauge = Gauge(name, description, read)
+        self._metrics.append(gauge)
+        return gauge
+
+    def render(self) -> str:
+        """ Returns every registered metric in the Prometheus text exposition format. """
+        return "".join(metric.render() for metric in self._metrics)
+
+    def write_textfile(self, path: str):
+        """ Atomically writes render() to a file, for another process to serve. """
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w') as file:
+            file.write(self.render())
+        os.replace(temp_path, path)
+
+def read_textfile(path: str) -> str:
+    """ Returns metrics written by another process with write_textfile(), or '' if there are none. """
+    try:
+        with open(path) as file:
+            return file.read()
+    except FileNotFoundError:
+        return ""
+
+# ------------------------- Command Timing -------------------------
+
+class CommandTiming:
+
+    def __init__(self, name: str):
+        self.name = name
+        self.start = time.perf_counter()
+        self.defer = None  # Seconds until the interaction was first acknowledged
+        self.totals = {'db': 0.0, 'api': 0.0}
+        self._in_call = False
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+_current_timing = contextvars.ContextVar('current_timing', default=None)
+
+def start_timing(name: str) -> CommandTiming:
+    """ Starts timing a command and makes it the current timing for this task and any it spawns. """
+    timing = CommandTiming(name)
+    _current_timing.set(timing)
+    return timing
+
+def _add_time(kind: str, func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        timing = _current_timing.get()
+
+        # Nested calls (records functions calling each other) are counted once
+        if timing is None or timing._in_call:
+            return func(*args, **kwargs)
+        timing._in_call = True
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            timing._in_call = False
+            timing.totals[kind] += time.perf_counter() - start
+    return wrapper
+
+def instrument_module(module, kind: str):
+    """ Wraps every public function defined in a module so its time counts towards `kind`. """
+    for name, value in list(vars(module).items()):
+        if isinstance(value, types.FunctionType) and not name.startswith('_') and value.__module__ == module.__name__:
+            setattr(module, name, _add_time(kind, value))
+
+def timed_request(request):
+    """
+    Wraps a bound discord.py request method (HTTPClient or the webhook adapter used for
+    interaction responses) so Discord API time counts towards 'api'.
+    The first interaction callback (defer or response) also sets the timing's `defer`.
+    """
+    @functools.wraps(request)
+    async def wrapper(route, *args, **kwargs):
+        timing = _current_timing.get()
+        if timing is None:
+            return await request(route, *args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return await request(route, *args, **kwargs)
+        finally:
+            end = time.perf_counter()
+            timing.totals['api'] += end - start
+            if timing.defer is None and route.path.endswith('/callback'):
+                timing.defer = end - timing.start
+    return wrapper
@@ -0,0 +1,70 @@
+import time
+
+'''
+In-memory token bucket rate limiting.
+
+A bucket holds up to `capacity` tokens and refills at `rate` tokens per second. Each action
+takes one token, so a bucket allows short bursts of up to `capacity` actions and a steady
+`rate` after that.
+'''
+
+class TokenBucket:
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def retry_after(self) -> float:
+        """ Returns 0 if a token is available, otherwise the seconds until one will be. """
+        self._refill()
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def consume(self):
+        """ Takes a token. Check retry_after() first. """
+        self._refill()
+        self.tokens -= 1
+
+    def refund(self):
+        """ Gives back a token taken by consume(), e.g. when the action failed. """
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + 1)
+
+    def is_full(self) -> bool:
+        self._refill()
+        return self.tokens >= self.capacity
+
+class KeyedRateLimiter:
+    """ A separate token bucket per key (e.g. per Discord ID or per email). """
+
+    def __init__(self, rate: float, capacity: float, max_keys: int = 10000):
+        self.rate = rate
+        self.capacity = capacity
+        self.max_keys = max_keys
+        self._buckets = {}
+
+    def _bucket(self, key) -> TokenBucket:
+        if key not in self._buckets:
+            # Full buckets behave exactly like new ones, so they can be dropped to bound memory
+            if len(self._buckets) >= self.max_keys:
+                self._buckets = {k: b for k, b in self._buckets.items() if not b.is_full()}
+            self._buckets[key] = TokenBucket(self.rate, self.capacity)
+        return self._buckets[key]
+
+    def retry_after(self, key) -> float:
+        """ Returns 0 if `key` may act now, otherwise the seconds until it may. """
+        return self._bucket(key).retry_after()
+
+    def consume(self, key):
+        """ Takes a token from `key`'s bucket. Check retry_after() first. """
+        self._bucket(key).consume()
+
+    def refund(self, key):
+        """ Gives back a token taken from `key`'s bucket by consume(). """
+        if key in self._buckets: self._buckets[key].refund()
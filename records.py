@@ -1,3 +1,4 @@
+import os
 import sqlite3
 import threading
 
@@ -35,6 +36,8 @@ Team Table: {
     Category_ID: BIGINT - NOT NULL
     Text_ID:     BIGINT - NOT NULL
     Voice_ID:    BIGINT
+
+    Status:      TEXT - NOT NULL - DEFAULT 'active' ('pending' while its channels are being created)
 }
 
 Code Table {
@@ -48,10 +51,50 @@ Category Channel Table {
     id:         INTEGER PRIMARY KEY AUTOINCREMENT,
     discord_id: INTEGER NOT NULL
 }
+
+Jobs Table {
+    ID:         INT - KEY - AUTOINCREMENT
+    Kind:       TEXT - NOT NULL (e.g. 'broadcast')
+    Payload:    TEXT - NOT NULL (JSON arguments)
+    Status:     TEXT - NOT NULL - DEFAULT 'queued' ('queued', 'running', 'done' or 'failed')
+
+    Progress:   INT - NOT NULL - DEFAULT 0
+    Total:      INT
+    Checkpoint: TEXT (JSON, where a resumed job picks up from)
+    Result:     TEXT (summary, or the error if it failed)
+
+    Created_By: BIGINT (Discord ID)
+    Created_At: INT - Unix time
+    Updated_At: INT - Unix time
+}
+
+Webhook Ledger Table {
+    Email:    TEXT - KEY - REFERENCES {REG TABLE}(Email)
+    Digest:   TEXT - NOT NULL (hash of the last registration received for this email)
+    Response: TEXT - NOT NULL (JSON response that was sent for it)
+}
+
+Role Changes Table {
+    ID:    INT - KEY - AUTOINCREMENT
+    Email: TEXT - NOT NULL (registration whose roles changed, filled in by a trigger)
+}
+
+Data Version Table {
+    ID:      INT - KEY (always 1)
+    Version: INT - NOT NULL (bumped by triggers on every change to the registration, verified and team tables)
+}
+
+Timers Table {
+    ID:      INT - KEY - AUTOINCREMENT
+    Kind:    TEXT - NOT NULL (e.g. 'code_expiry')
+    Payload: TEXT - NOT NULL (JSON arguments)
+    Due_At:  REAL - NOT NULL - INDEXED (Unix time)
+    Key:     TEXT - UNIQUE (optional; scheduling the same key again replaces the timer)
+}
 """
 
 
-_DATABASE_FILE = 'records.db'
+_DATABASE_FILE = os.environ.get('RECORDS_DB', 'records.db') # Opened on import, so it can only be changed beforehand
 _LOCK = threading.Lock()
 
 _REG_TABLE_NAME = 'registration'
@@ -59,6 +102,11 @@ _VERIFIED_TABLE_NAME = 'verified'
 _TEAM_TABLE_NAME = 'teams'
 _CODE_TABLE_NAME = 'codes'
 _CATEGORY_BUCKET_NAME = 'category_bucket'
+_JOB_TABLE_NAME = 'jobs'
+_TIMER_TABLE_NAME = 'timers'
+_LEDGER_TABLE_NAME = 'webhook_ledger'
+_ROLE_CHANGE_TABLE_NAME = 'role_changes'
+_DATA_VERSION_TABLE_NAME = 'data_version'
 
 def _initialize_db():
 
@@ -106,9 +154,12 @@ def _initialize_db():
                 role_id INTEGER NOT NULL,
                 category_id INTEGER NOT NULL,
                 text_id INTEGER NOT NULL,
-                voice_id INTEGER
+                voice_id INTEGER,
+
+                status TEXT NOT NULL DEFAULT 'active'
             )
         """)
+        _add_column_if_missing(conn, _TEAM_TABLE_NAME, 'status', "TEXT NOT NULL DEFAULT 'active'")
 
         # 4. CODES TABLE (Temporary Storage)
         conn.execute(f"""
@@ -126,9 +177,105 @@ def _initialize_db():
                 discord_id INTEGER NOT NULL
             )
         """)
+
+        # 6. Jobs Table (Background work queued by the bot, see jobs.py)
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {_JOB_TABLE_NAME} (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'queued',
+
+                progress INTEGER NOT NULL DEFAULT 0,
+                total INTEGER,
+                checkpoint TEXT,
+                result TEXT,
+
+                created_by INTEGER,
+                created_at INTEGER NOT NULL DEFAULT (strftime('%s', 'now')),
+                updated_at INTEGER NOT NULL DEFAULT (strftime('%s', 'now'))
+            )
+        """)
+
+        # 7. Timers Table (Deadlines fired by the bot's scheduler, see scheduler.py)
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {_TIMER_TABLE_NAME} (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                due_at REAL NOT NULL,
+                key TEXT UNIQUE
+            )
+        """)
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {_TIMER_TABLE_NAME}_due_at ON {_TIMER_TABLE_NAME} (due_at)")
+
+        # 8. Webhook Ledger (Lets web.py answer repeated deliveries without writing)
+        # ON DELETE CASCADE: Deleting a Registration forgets its deliveries, so a replay re-adds it.
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {_LEDGER_TABLE_NAME} (
+                email TEXT PRIMARY KEY REFERENCES {_REG_TABLE_NAME}(email) ON DELETE CASCADE,
+                digest TEXT NOT NULL,
+                response TEXT NOT NULL
+            )
+        """)
+        # Any other write to a registration (batch endpoint, imports, role edits) forgets its delivery,
+        # so a later delivery is compared against what the row holds now. The webhook writes its
+        # ledger row after its registration, in the same transaction.
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {_REG_TABLE_NAME}_forget_delivery
+            AFTER UPDATE ON {_REG_TABLE_NAME}
+            BEGIN
+                DELETE FROM {_LEDGER_TABLE_NAME} WHERE email IN (old.email, new.email);
+            END
+        """)
+
+        # 9. Role Changes (Change feed the bot consumes to resync members, whichever process made the change)
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {_ROLE_CHANGE_TABLE_NAME} (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                email TEXT NOT NULL
+            )
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {_REG_TABLE_NAME}_role_change
+            AFTER UPDATE OF is_participant, is_judge, is_mentor ON {_REG_TABLE_NAME}
+            WHEN old.is_participant IS NOT new.is_participant
+              OR old.is_judge IS NOT new.is_judge
+              OR old.is_mentor IS NOT new.is_mentor
+            BEGIN
+                INSERT INTO {_ROLE_CHANGE_TABLE_NAME} (email) VALUES (new.email);
+            END
+        """)
+
+        # 10. Data Version (Lets web.py's read API tell whether anything changed without querying)
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {_DATA_VERSION_TABLE_NAME} (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                version INTEGER NOT NULL
+            )
+        """)
+        conn.execute(f"INSERT OR IGNORE INTO {_DATA_VERSION_TABLE_NAME} (id, version) VALUES (1, 0)")
+        for table in (_REG_TABLE_NAME, _VERIFIED_TABLE_NAME, _TEAM_TABLE_NAME):
+            for event in ('INSERT', 'UPDATE', 'DELETE'):
+                conn.execute(f"""
+                    CREATE TRIGGER IF NOT EXISTS {table}_{event.lower()}_version
+                    AFTER {event} ON {table}
+                    BEGIN
+                        UPDATE {_DATA_VERSION_TABLE_NAME} SET version = version + 1 WHERE id = 1;
+                    END
+                """)
+
+        # Team members are looked up by team
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {_VERIFIED_TABLE_NAME}_team_id ON {_VERIFIED_TABLE_NAME} (team_id)")
         
         conn.commit()
 
+def _add_column_if_missing(conn, table: str, column: str, definition: str):
+    """Private helper: Adds a column to a table created by an older version of this file."""
+    columns = [row['name'] for row in conn.execute(f"PRAGMA table_info({table})")]
+    if column not in columns:
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
 def _get_connection():
     """Private helper: Gets a thread-safe connection with Foreign Keys enabled."""
     conn = sqlite3.connect(_DATABASE_FILE, timeout=20)
@@ -138,26 +285,69 @@ def _get_connection():
 
 # ----------------- Reg Table Functions -----------------
 
+# "Upsert" Logic: If email exists, UPDATE fields. If not, INSERT.
+_UPSERT_REGISTRATION = f"""
+    INSERT INTO {_REG_TABLE_NAME} (email, first_name, last_name, is_capstone, is_participant, is_judge, is_mentor)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(email) DO UPDATE SET
+        first_name = excluded.first_name,
+        last_name = excluded.last_name,
+        is_capstone = excluded.is_capstone,
+        is_participant = excluded.is_participant,
+        is_judge = excluded.is_judge,
+        is_mentor = excluded.is_mentor
+"""
+
+def normalize_email(email: str) -> str:
+    """ Returns the form of an email used as the registration key: lowercase, with all whitespace removed. """
+    return ''.join(email.split()).lower()
+
+def _registration_params(email: str, first_name: str, last_name: str, is_capstone: bool, roles: list) -> tuple:
+    """Private helper: Converts a registration to the parameters of _UPSERT_REGISTRATION."""
+    return (email, first_name, last_name, is_capstone, 'participant' in roles, 'judge' in roles, 'mentor' in roles)
+
 def add_registration(email: str, first_name: str, last_name: str, is_capstone: bool, roles: list):
     """ Adds a new user to the registration table. """
-    
-    is_p = 'participant' in roles
-    is_j = 'judge' in roles
-    is_m = 'mentor' in roles
+    with _LOCK, _get_connection() as conn:
+        conn.execute(_UPSERT_REGISTRATION, _registration_params(email, first_name, last_name, is_capstone, roles))
+        conn.commit()
 
+def add_registrations(registrations: list):
+    """
+    Adds or updates many users in a single transaction.
+    Each registration is a tuple of add_registration()'s arguments: (email, first_name, last_name, is_capstone, roles)
+    """
     with _LOCK, _get_connection() as conn:
-        # "Upsert" Logic: If email exists, UPDATE fields. If not, INSERT.
-        conn.execute(f"""
-            INSERT INTO {_REG_TABLE_NAME} (email, first_name, last_name, is_capstone, is_participant, is_judge, is_mentor)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-            ON CONFLICT(email) DO UPDATE SET
-                first_name = excluded.first_name,
-                last_name = excluded.last_name,
-                is_capstone = excluded.is_capstone,
-                is_participant = excluded.is_participant,
-                is_judge = excluded.is_judge,
-                is_mentor = excluded.is_mentor
-        """, (email, first_name, last_name, is_capstone, is_p, is_j, is_m))
+        conn.executemany(_UPSERT_REGISTRATION, [_registration_params(*registration) for registration in registrations])
+        conn.commit()
+
+def get_webhook_response(email: str, digest: str) -> str:
+    """ Returns the response sent for the last registration received for `email` if it had this digest, else None. """
+    with _get_connection() as conn:
+        row = conn.execute(f"SELECT response FROM {_LEDGER_TABLE_NAME} WHERE email = ? AND digest = ?", (email, digest)).fetchone()
+        return row['response'] if row else None
+
+def add_webhook_registration(registration: tuple, digest: str, response: str):
+    """
+    Adds or updates a registration received by web.py and records its digest and response
+    in the webhook ledger, in one transaction.
+    `registration` is a tuple of add_registration()'s arguments.
+    """
+    with _LOCK, _get_connection() as conn:
+        conn.execute(_UPSERT_REGISTRATION, _registration_params(*registration))
+        conn.execute(f"INSERT OR REPLACE INTO {_LEDGER_TABLE_NAME} (email, digest, response) VALUES (?, ?, ?)",
+                     (registration[0], digest, response))
+        conn.commit()
+
+def add_webhook_registrations(entries: list):
+    """
+    Like add_webhook_registration() for many registrations in one transaction.
+    Each entry is a tuple of (registration, digest, response). Later entries for the same email win.
+    """
+    with _LOCK, _get_connection() as conn:
+        conn.executemany(_UPSERT_REGISTRATION, [_registration_params(*registration) for registration, _, _ in entries])
+        conn.executemany(f"INSERT OR REPLACE INTO {_LEDGER_TABLE_NAME} (email, digest, response) VALUES (?, ?, ?)",
+                         [(registration[0], digest, response) for registration, digest, response in entries])
         conn.commit()
 
 def remove_registration(email: str):
@@ -179,6 +369,18 @@ def get_registration(email: str) -> dict:
         row = conn.execute(f"SELECT * FROM {_REG_TABLE_NAME} WHERE email = ?", (email,)).fetchone()
         return dict(row) if row else None
 
+def get_registrations(emails: list) -> list:
+    """ Returns the user rows for the given emails as dictionaries, skipping emails that aren't registered. """
+    emails = list(emails)
+    rows = []
+    with _get_connection() as conn:
+        # Stay under SQLite's limit on query parameters
+        for start in range(0, len(emails), 500):
+            batch = emails[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            rows.extend(conn.execute(f"SELECT * FROM {_REG_TABLE_NAME} WHERE email IN ({placeholders})", batch).fetchall())
+    return [dict(row) for row in rows]
+
 def update_roles(email: str, roles: list):
     """ Updates the role flags for a specific user. """
     
@@ -294,6 +496,28 @@ def get_verified_user(identifier) -> dict:
         
         return dict(row) if row else None
 
+def get_all_verified_roles() -> dict:
+    """
+    Returns the role flags of every verified user in one query.
+    Keyed by Discord ID: { discord_id: ['participant', 'mentor'], ... }
+    """
+    with _get_connection() as conn:
+        rows = conn.execute(f"""
+            SELECT v.discord_id, r.is_participant, r.is_judge, r.is_mentor
+            FROM {_VERIFIED_TABLE_NAME} v
+            JOIN {_REG_TABLE_NAME} r ON v.email = r.email
+            WHERE v.discord_id IS NOT NULL
+        """).fetchall()
+
+    roles_by_id = {}
+    for row in rows:
+        roles = []
+        if row['is_participant']: roles.append('participant')
+        if row['is_judge']: roles.append('judge')
+        if row['is_mentor']: roles.append('mentor')
+        roles_by_id[row['discord_id']] = roles
+    return roles_by_id
+
 def get_verified_email(discord_id: int) -> str:
     """ Finds the verified email associated with a Discord ID. """
     with _get_connection() as conn:
@@ -323,8 +547,72 @@ def get_user_team_id(identifier) -> int:
             raise ValueError("Identifier must be an int (Discord ID) or str (Email)")
         return row['team_id'] if row else None
         
+def get_team_assignments() -> dict:
+    """ Returns every verified user on a team as { discord_id: team_id }. """
+    with _get_connection() as conn:
+        rows = conn.execute(f"""
+            SELECT discord_id, team_id FROM {_VERIFIED_TABLE_NAME}
+            WHERE team_id IS NOT NULL AND discord_id IS NOT NULL
+        """).fetchall()
+        return {row['discord_id']: row['team_id'] for row in rows}
+        
 # ---------------- Team Table Functions ------------------
 
+def reserve_team(name: str, is_capstone: bool) -> int:
+    """
+    Claims a team name and ID by inserting a 'pending' team row.
+    The Discord IDs are filled in by set_pending_team_ids() as the role and channels are created.
+    Returns the new team ID, or None if the name is already taken.
+    """
+    with _LOCK, _get_connection() as conn:
+        try:
+            cursor = conn.execute(f"""
+                INSERT INTO {_TEAM_TABLE_NAME} (name, is_capstone, role_id, category_id, text_id, status)
+                VALUES (?, ?, 0, 0, 0, 'pending')
+            """, (name, is_capstone))
+        except sqlite3.IntegrityError:
+            return None
+        conn.commit()
+        return cursor.lastrowid
+
+def set_pending_team_ids(team_id: int, ids: dict):
+    """
+    Stores Discord IDs on a pending team as they are created, so an interrupted creation can
+    be cleaned up later. `ids` maps columns (role_id, category_id, text_id, voice_id) to IDs.
+    """
+    columns = [column for column in ('role_id', 'category_id', 'text_id', 'voice_id') if column in ids]
+    if not columns: return
+    with _LOCK, _get_connection() as conn:
+        conn.execute(f"""
+            UPDATE {_TEAM_TABLE_NAME} SET {', '.join(f'{column} = ?' for column in columns)}
+            WHERE id = ? AND status = 'pending'
+        """, (*(ids[column] for column in columns), team_id))
+        conn.commit()
+
+def activate_team(team_id: int, role_id: int, category_id: int, text_id: int, voice_id, team_lead: int, member_ids: list):
+    """
+    Commits a pending team in one transaction: stores its Discord IDs, marks it 'active',
+    sets the team lead, and assigns the lead and members to it.
+    Raises ValueError, changing nothing, if the team is no longer pending.
+    """
+    with _LOCK, _get_connection() as conn:
+        cursor = conn.execute(f"""
+            UPDATE {_TEAM_TABLE_NAME}
+            SET role_id = ?, category_id = ?, text_id = ?, voice_id = ?, team_lead = ?, status = 'active'
+            WHERE id = ? AND status = 'pending'
+        """, (role_id, category_id, text_id, voice_id, team_lead, team_id))
+        if cursor.rowcount != 1:
+            raise ValueError(f"Team {team_id} is no longer pending")
+        conn.executemany(f"UPDATE {_VERIFIED_TABLE_NAME} SET team_id = ? WHERE discord_id = ?",
+                         [(team_id, discord_id) for discord_id in [team_lead, *member_ids]])
+        conn.commit()
+
+def get_pending_teams() -> list:
+    """ Returns a list of team dictionaries that were reserved but never activated. """
+    with _get_connection() as conn:
+        rows = conn.execute(f"SELECT * FROM {_TEAM_TABLE_NAME} WHERE status = 'pending'").fetchall()
+        return [dict(row) for row in rows]
+
 def create_team(name: str, is_capstone: bool, role_id: int, category_id: int, text_id: int, voice_id=None) -> int:
     """ Creates a new team and returns its new database ID. """
     with _LOCK, _get_connection() as conn:
@@ -349,6 +637,25 @@ def remove_team(identifier):
             raise ValueError("Identifier must be int (ID) or str (Name)")
         conn.commit()
 
+def remove_teams(team_ids: list) -> dict:
+    """
+    Deletes many teams by ID in a single transaction, clearing every member's team_id.
+    Returns the members each deleted team had: { team_id: [discord_id, ...] }
+    """
+    members_by_team = {}
+    with _LOCK, _get_connection() as conn:
+        for team_id in team_ids:
+            if not conn.execute(f"SELECT 1 FROM {_TEAM_TABLE_NAME} WHERE id = ?", (team_id,)).fetchone():
+                continue
+            rows = conn.execute(f"SELECT discord_id FROM {_VERIFIED_TABLE_NAME} WHERE team_id = ?", (team_id,)).fetchall()
+            members_by_team[team_id] = [row['discord_id'] for row in rows]
+
+        params = [(team_id,) for team_id in members_by_team]
+        conn.executemany(f"UPDATE {_VERIFIED_TABLE_NAME} SET team_id = NULL WHERE team_id = ?", params)
+        conn.executemany(f"DELETE FROM {_TEAM_TABLE_NAME} WHERE id = ?", params)
+        conn.commit()
+    return members_by_team
+
 def team_exists(identifier) -> bool:
     """ Checks if a team exists by ID (int) or Name (str). """
     with _get_connection() as conn:
@@ -406,9 +713,9 @@ def get_next_team_id() -> int:
             return 1
 
 def get_all_teams() -> list:
-    """ Returns a list of all team dictionaries. """
+    """ Returns a list of all active team dictionaries. """
     with _get_connection() as conn:
-        rows = conn.execute(f"SELECT * FROM {_TEAM_TABLE_NAME}").fetchall()
+        rows = conn.execute(f"SELECT * FROM {_TEAM_TABLE_NAME} WHERE status = 'active'").fetchall()
         return [dict(row) for row in rows]
 
 def set_team_lead(team_id: int, lead_id: int):
@@ -475,6 +782,12 @@ def get_value_from_code(code: str) -> dict:
         row = conn.execute("SELECT * FROM codes WHERE code = ?", (code,)).fetchone()
         return dict(row) if row else None
 
+def get_user_code(discord_id: int) -> dict:
+    """ Retrieves the pending code (and its email) for a Discord ID, or None if there isn't one. """
+    with _get_connection() as conn:
+        row = conn.execute("SELECT * FROM codes WHERE discord_id = ?", (discord_id,)).fetchone()
+        return dict(row) if row else None
+
 def remove_code(code: str):
     """ Deletes a code from the database. """
     with _LOCK, _get_connection() as conn:
@@ -496,4 +809,171 @@ def push_new_category(discord_id: int):
         conn.execute(f"INSERT INTO {_CATEGORY_BUCKET_NAME} (discord_id) VALUES (?)", (discord_id,))
         conn.commit()
 
+def remove_all_categories() -> list:
+    """ Empties the stack, e.g. once every team is gone. Returns the Discord IDs it held. """
+    with _LOCK, _get_connection() as conn:
+        rows = conn.execute(f"SELECT discord_id FROM {_CATEGORY_BUCKET_NAME}").fetchall()
+        conn.execute(f"DELETE FROM {_CATEGORY_BUCKET_NAME}")
+        conn.commit()
+        return [row['discord_id'] for row in rows]
+
+# ------------------- Job Table Functions ---------------------
+
+def add_job(kind: str, payload: str, created_by: int = None) -> int:
+    """ Queues a job and returns its ID. `payload` is a JSON string. """
+    with _LOCK, _get_connection() as conn:
+        cursor = conn.execute(f"INSERT INTO {_JOB_TABLE_NAME} (kind, payload, created_by) VALUES (?, ?, ?)",
+                              (kind, payload, created_by))
+        conn.commit()
+        return cursor.lastrowid
+
+def claim_next_job() -> dict:
+    """ Marks the oldest queued job as 'running' and returns it, or None if the queue is empty. """
+    with _LOCK, _get_connection() as conn:
+        row = conn.execute(f"SELECT * FROM {_JOB_TABLE_NAME} WHERE status = 'queued' ORDER BY id LIMIT 1").fetchone()
+        if not row:
+            return None
+        conn.execute(f"UPDATE {_JOB_TABLE_NAME} SET status = 'running', updated_at = strftime('%s', 'now') WHERE id = ?", (row['id'],))
+        conn.commit()
+        return {**dict(row), 'status': 'running'}
+
+def update_job_progress(job_id: int, progress: int, total, checkpoint):
+    """ Saves a running job's progress and checkpoint (a JSON string or None). """
+    with _LOCK, _get_connection() as conn:
+        conn.execute(f"""
+            UPDATE {_JOB_TABLE_NAME}
+            SET progress = ?, total = ?, checkpoint = ?, updated_at = strftime('%s', 'now')
+            WHERE id = ?
+        """, (progress, total, checkpoint, job_id))
+        conn.commit()
+
+def finish_job(job_id: int, status: str, result: str = None):
+    """ Marks a job as 'done' or 'failed' with a summary or error message. """
+    with _LOCK, _get_connection() as conn:
+        conn.execute(f"UPDATE {_JOB_TABLE_NAME} SET status = ?, result = ?, updated_at = strftime('%s', 'now') WHERE id = ?",
+                     (status, result, job_id))
+        conn.commit()
+
+def requeue_running_jobs() -> int:
+    """ Puts jobs left 'running' by a stopped worker back in the queue. Returns how many there were. """
+    with _LOCK, _get_connection() as conn:
+        cursor = conn.execute(f"UPDATE {_JOB_TABLE_NAME} SET status = 'queued' WHERE status = 'running'")
+        conn.commit()
+        return cursor.rowcount
+
+def get_recent_jobs(limit: int = 10) -> list:
+    """ Returns the most recently queued jobs as dictionaries, newest first. """
+    with _get_connection() as conn:
+        rows = conn.execute(f"SELECT * FROM {_JOB_TABLE_NAME} ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+        return [dict(row) for row in rows]
+
+# ------------------- Read API Functions ----------------------
+
+def get_data_version() -> int:
+    """ Returns a number that changes whenever a registration, verified user or team is added, changed or removed. """
+    with _get_connection() as conn:
+        return conn.execute(f"SELECT version FROM {_DATA_VERSION_TABLE_NAME} WHERE id = 1").fetchone()['version']
+
+def get_teams_page(after_id: int, limit: int) -> list:
+    """ Returns up to `limit` active teams with IDs greater than `after_id`, in ID order, each with its member count. """
+    with _get_connection() as conn:
+        rows = conn.execute(f"""
+            SELECT t.id, t.name, t.is_capstone, t.team_lead,
+                   (SELECT COUNT(*) FROM {_VERIFIED_TABLE_NAME} v WHERE v.team_id = t.id) AS member_count
+            FROM {_TEAM_TABLE_NAME} t
+            WHERE t.status = 'active' AND t.id > ?
+            ORDER BY t.id
+            LIMIT ?
+        """, (after_id, limit)).fetchall()
+        return [dict(row) for row in rows]
+
+def iter_team_member_emails():
+    """
+    Yields (team ID, team name, list of member emails) for every active team in ID order.
+    Uses one grouped query and reads it row by row, so memory use doesn't grow with the number of teams.
+    """
+    with _get_connection() as conn:
+        cursor = conn.execute(f"""
+            SELECT t.id, t.name, GROUP_CONCAT(v.email, char(10)) AS emails
+            FROM {_TEAM_TABLE_NAME} t
+            LEFT JOIN {_VERIFIED_TABLE_NAME} v ON v.team_id = t.id
+            WHERE t.status = 'active'
+            GROUP BY t.id
+            ORDER BY t.id
+        """)
+        for row in cursor:
+            yield row['id'], row['name'], row['emails'].split("\n") if row['emails'] else []
+
+def get_registration_counts() -> dict:
+    """ Returns the number of registrations in total and for each role, and how many are capstone. """
+    with _get_connection() as conn:
+        row = conn.execute(f"""
+            SELECT COUNT(*) AS total,
+                   COALESCE(SUM(is_participant), 0) AS participants,
+                   COALESCE(SUM(is_mentor), 0) AS mentors,
+                   COALESCE(SUM(is_judge), 0) AS judges,
+                   COALESCE(SUM(is_capstone), 0) AS capstone
+            FROM {_REG_TABLE_NAME}
+        """).fetchone()
+        return dict(row)
+
+def get_verification_counts() -> dict:
+    """ Returns the number of verified users, how many are on a team, and the number of active teams. """
+    with _get_connection() as conn:
+        row = conn.execute(f"""
+            SELECT COUNT(*) AS verified,
+                   COUNT(team_id) AS on_team,
+                   (SELECT COUNT(*) FROM {_TEAM_TABLE_NAME} WHERE status = 'active') AS teams
+            FROM {_VERIFIED_TABLE_NAME}
+        """).fetchone()
+        return dict(row)
+
+# --------------- Role Change Table Functions ------------------
+
+def get_role_changes(limit: int = 100) -> list:
+    """ Returns the oldest unprocessed role changes as dictionaries of id and email. """
+    with _get_connection() as conn:
+        rows = conn.execute(f"SELECT * FROM {_ROLE_CHANGE_TABLE_NAME} ORDER BY id LIMIT ?", (limit,)).fetchall()
+        return [dict(row) for row in rows]
+
+def remove_role_changes(up_to_id: int):
+    """ Deletes role changes up to and including the given ID, once they have been processed. """
+    with _LOCK, _get_connection() as conn:
+        conn.execute(f"DELETE FROM {_ROLE_CHANGE_TABLE_NAME} WHERE id <= ?", (up_to_id,))
+        conn.commit()
+
+# ------------------ Timer Table Functions --------------------
+
+def add_timer(kind: str, payload: str, due_at: float, key: str = None) -> int:
+    """
+    Stores a timer and returns its ID. `payload` is a JSON string and `due_at` a Unix time.
+    A timer with the same `key` is replaced.
+    """
+    with _LOCK, _get_connection() as conn:
+        if key is not None:
+            conn.execute(f"DELETE FROM {_TIMER_TABLE_NAME} WHERE key = ?", (key,))
+        cursor = conn.execute(f"INSERT INTO {_TIMER_TABLE_NAME} (kind, payload, due_at, key) VALUES (?, ?, ?, ?)",
+                              (kind, payload, due_at, key))
+        conn.commit()
+        return cursor.lastrowid
+
+def get_next_timer() -> dict:
+    """ Returns the timer that is due soonest, or None if there are none. """
+    with _get_connection() as conn:
+        row = conn.execute(f"SELECT * FROM {_TIMER_TABLE_NAME} ORDER BY due_at LIMIT 1").fetchone()
+        return dict(row) if row else None
+
+def remove_timer(timer_id: int):
+    """ Deletes a timer by ID. """
+    with _LOCK, _get_connection() as conn:
+        conn.execute(f"DELETE FROM {_TIMER_TABLE_NAME} WHERE id = ?", (timer_id,))
+        conn.commit()
+
+def cancel_timer(key: str) -> bool:
+    """ Deletes the timer with the given key. Returns whether there was one. """
+    with _LOCK, _get_connection() as conn:
+        cursor = conn.execute(f"DELETE FROM {_TIMER_TABLE_NAME} WHERE key = ?", (key,))
+        conn.commit()
+        return cursor.rowcount > 0
+
 _initialize_db()
\ No newline at end of file
@@ -0,0 +1,79 @@
+import asyncio
+import json
+import logging
+import time
+
+import records
+
+'''
+Durable timers.
+
+Deadlines (verification codes expiring, under-sized teams being removed, scheduled
+announcements) are stored in the timers table of records.db, so they survive restarts.
+A single TimerScheduler task on the bot's event loop sleeps until the earliest timer is
+due, runs its handler and deletes it. Finding the next timer uses the index on due_at, so
+scheduling and firing cost O(log n) however many timers are pending.
+
+Timers that came due while the bot was down fire as soon as it starts again. A timer is
+deleted only after its handler returns, so handlers should be safe to run twice.
+'''
+
+logger = logging.getLogger(__name__)
+
+class TimerScheduler:
+
+    def __init__(self, max_sleep: float = 60):
+        """
+        Args:
+            max_sleep (float): Longest the scheduler sleeps before checking the table again,
+                in case a timer was added by another process.
+        """
+        self.max_sleep = max_sleep
+        self.handlers = {}  # kind -> async handler(payload)
+
+        self._wakeup = None
+        self._task = None
+
+    def register(self, kind: str, handler):
+        """ Sets the coroutine function called with the payload of each timer of the given kind. """
+        self.handlers[kind] = handler
+
+    def schedule(self, kind: str, payload: dict, delay: float, key: str = None) -> int:
+        """
+        Schedules a timer `delay` seconds from now and returns its ID.
+        Scheduling with the `key` of a pending timer replaces that timer.
+        """
+        timer_id = records.add_timer(kind, json.dumps(payload), time.time() + delay, key)
+        if self._wakeup: self._wakeup.set()
+        return timer_id
+
+    def cancel(self, key: str) -> bool:
+        """ Cancels the pending timer with the given key. Returns whether there was one. """
+        return records.cancel_timer(key)
+
+    def start(self):
+        """ Starts firing timers. Must be called from the event loop. """
+        if self._task: return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            timer = records.get_next_timer()
+            delay = timer['due_at'] - time.time() if timer else self.max_sleep
+            if delay > 0:
+                # Sleep until the timer is due, or until an earlier one is scheduled
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), min(delay, self.max_sleep))
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            try:
+                handler = self.handlers.get(timer['kind'])
+                if not handler: raise ValueError(f"No handler for timer kind '{timer['kind']}'")
+                await handler(json.loads(timer['payload']))
+            except Exception as e:
+                logger.exception(f"Timer {timer['id']} ({timer['kind']}) failed: {e}")
+            records.remove_timer(timer['id'])
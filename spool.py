@@ -0,0 +1,219 @@
+import collections
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+import records
+
+'''
+Write-behind spool for registrations received by web.py.
+
+Instead of writing to records.db (which it shares with the bot) while the request waits,
+web.py can append each validated registration to an append-only file, fsync it, and answer
+straight away. A drain thread applies the spool to the database in batches with one bulk
+upsert per batch, then records how far it got in a small offset file next to the spool.
+
+Anything not yet applied when the process stops is replayed on the next start. A crash
+between applying a batch and saving the offset replays that batch, which is harmless
+because the upsert is idempotent.
+
+If a batch can't be written for a reason other than the database being busy or unavailable,
+its entries are applied one at a time, and any entry that still fails is moved to a
+dead-letter file (`path`.dead) so it can't hold up the ones behind it.
+
+Spool file: one JSON object per line,
+    {"registration": [email, first_name, last_name, is_capstone, roles], "digest": str, "response": str, "received_at": float}
+'''
+
+logger = logging.getLogger(__name__)
+
+def check_registration(registration: tuple):
+    """ Raises ValueError unless the registration has the types records.add_registrations() can write. """
+    email, first_name, last_name, is_capstone, roles = registration
+    if not isinstance(email, str) or not email:
+        raise ValueError("email must be a non-empty string")
+    if not all(name is None or isinstance(name, str) for name in (first_name, last_name)):
+        raise ValueError("first and last name must be strings or null")
+    if not isinstance(is_capstone, bool):
+        raise ValueError("is_capstone must be a boolean")
+    if not isinstance(roles, (list, tuple)) or not all(isinstance(role, str) for role in roles):
+        raise ValueError("roles must be a list of strings")
+
+def _webhook_registration(entry: dict) -> tuple:
+    """ Converts a spool entry to the (registration, digest, response) taken by records.add_webhook_registrations(). """
+    return tuple(entry['registration']), entry['digest'], entry['response']
+
+class RegistrationSpool:
+
+    def __init__(self, path: str, batch_size: int = 500, interval: float = 0.5, compact_bytes: int = 1_000_000):
+        """
+        Args:
+            path (str): Spool file. The drained offset is kept in `path`.offset, and entries that
+                        could not be written in `path`.dead.
+            batch_size (int): Most registrations applied per transaction.
+            interval (float): Seconds the drain thread waits when the spool is empty.
+            compact_bytes (int): Size a fully drained spool must reach before it is truncated.
+        """
+        self.path = path
+        self.offset_path = f"{path}.offset"
+        self.dead_letter_path = f"{path}.dead"
+        self.batch_size = batch_size
+        self.interval = interval
+        self.compact_bytes = compact_bytes
+
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._file = None
+        self._offset = 0
+        self._pending = collections.deque()  # received_at of each registration not yet applied
+        self._pending_digests = {}  # email -> digest of its latest registration not yet applied
+
+    def start(self):
+        """ Opens the spool, queues anything left over from the last run, and starts draining. """
+        self._offset = self._load_offset()
+        self._repair()
+        self._file = open(self.path, 'ab')
+        for entry in self._read(self._offset, None)[0]:
+            self._track(entry)
+        if self._pending:
+            logger.warning(f"Replaying {len(self._pending)} spooled registration(s) left from the last run")
+        threading.Thread(target=self._drain_forever, name="spool-drain", daemon=True).start()
+
+    # ------------------------- Receiving -------------------------
+
+    def is_pending(self, email: str, digest: str) -> bool:
+        """ Returns whether this exact registration is already spooled and waiting to be applied. """
+        with self._lock:
+            return self._pending_digests.get(email) == digest
+
+    def append(self, registration: tuple, digest: str, response: str):
+        """ Durably appends a registration. Returns once it is on disk. Raises ValueError if it could never be written. """
+        check_registration(registration)
+        entry = {'registration': registration, 'digest': digest, 'response': response, 'received_at': time.time()}
+        line = (json.dumps(entry) + "\n").encode()
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._track(entry)
+        self._wakeup.set()
+
+    def _track(self, entry: dict):
+        self._pending.append(entry['received_at'])
+        self._pending_digests[entry['registration'][0]] = entry['digest']
+
+    # ------------------------- Draining -------------------------
+
+    def _drain_forever(self):
+        while True:
+            try:
+                applied = self.drain()
+            except Exception as e:
+                logger.exception(f"Could not apply spooled registrations, retrying: {e}")
+                applied = 0
+            if not applied:
+                self._wakeup.wait(self.interval)
+                self._wakeup.clear()
+
+    def drain(self) -> int:
+        """ Applies the next batch of spooled registrations. Returns how many were applied. """
+        entries, end = self._read(self._offset, self.batch_size)
+        if not entries:
+            self._compact()
+            return 0
+
+        try:
+            records.add_webhook_registrations([_webhook_registration(entry) for entry in entries])
+        except sqlite3.OperationalError:
+            raise # The database is busy or unavailable, so retry the whole batch later
+        except Exception as e:
+            logger.error(f"Could not apply a batch of {len(entries)} spooled registrations, applying them one at a time: {e}")
+            self._apply_each(entries)
+        self._save_offset(end)
+        with self._lock:
+            self._offset = end
+            for entry in entries:
+                self._pending.popleft()
+                email = entry['registration'][0]
+                if self._pending_digests.get(email) == entry['digest']:
+                    del self._pending_digests[email]
+        return len(entries)
+
+    def _apply_each(self, entries: list):
+        """ Applies entries one at a time, moving any that fail to the dead-letter file. """
+        for entry in entries:
+            try:
+                records.add_webhook_registrations([_webhook_registration(entry)])
+            except sqlite3.OperationalError:
+                raise
+            except Exception as e:
+                logger.exception(f"Moved a spooled registration that could not be written to {self.dead_letter_path}: {e}",
+                                 extra={'fields': {'email': entry['registration'][0]}})
+                with open(self.dead_letter_path, 'a') as file:
+                    file.write(json.dumps({**entry, 'error': str(e), 'failed_at': time.time()}, default=repr) + "\n")
+                    file.flush()
+                    os.fsync(file.fileno())
+
+    def _read(self, offset: int, limit) -> tuple:
+        """ Returns (up to `limit` complete entries after `offset`, offset just past the last one). """
+        entries = []
+        with open(self.path, 'rb') as file:
+            file.seek(offset)
+            for line in file:
+                if not line.endswith(b"\n"): break # Still being written
+                entries.append(json.loads(line))
+                offset += len(line)
+                if limit and len(entries) >= limit: break
+        return entries, offset
+
+    def _compact(self):
+        """ Empties the spool file once everything in it has been applied and it has grown large. """
+        with self._lock:
+            if self._offset < self.compact_bytes or self._offset != os.fstat(self._file.fileno()).st_size: return
+            self._file.truncate(0)
+            self._file.seek(0)
+            self._offset = 0
+            self._save_offset(0)
+
+    # ------------------------- Offsets -------------------------
+
+    def _load_offset(self) -> int:
+        try:
+            with open(self.offset_path) as file:
+                return int(file.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+
+    def _save_offset(self, offset: int):
+        temp_path = f"{self.offset_path}.tmp"
+        with open(temp_path, 'w') as file:
+            file.write(str(offset))
+        os.replace(temp_path, self.offset_path)
+
+    def _repair(self):
+        """ Drops a torn last line (never acknowledged) and fixes an offset left past the end by a crash while compacting. """
+        if not os.path.exists(self.path):
+            open(self.path, 'wb').close()
+        with open(self.path, 'rb+') as file:
+            data = file.read()
+            data_end = data.rfind(b"\n") + 1
+            if data_end < len(data):
+                file.truncate(data_end)
+        if self._offset > data_end:
+            self._offset = 0
+            self._save_offset(0)
+
+    # ------------------------- Reporting -------------------------
+
+    def depth(self) -> int:
+        """ Returns the number of registrations waiting to be applied. """
+        with self._lock:
+            return len(self._pending)
+
+    def lag(self) -> float:
+        """ Returns how long the oldest waiting registration has been in the spool, in seconds (0 if none). """
+        with self._lock:
+            return time.time() - self._pending[0] if self._pending else 0.0
@@ -1,14 +1,30 @@
-import multiprocessing
-import bot
-import web
+import logging
+
+import config
+import log_setup
+from supervisor import Child, Supervisor
+
+# The bot and web modules are imported in their own processes only. Importing web here would
+# let eventlet replace the sockets of the supervisor's health endpoint.
+def run_bot(heartbeat):
+    import bot
+    bot.start(heartbeat)
+
+def run_web(heartbeat):
+    import web
+    web.start(heartbeat)
 
 #If file is ran
 if __name__ == "__main__":
+    log_listener = log_setup.setup_logging('supervisor.log', console_level=logging.INFO)
 
-    #Start Multithreading process for web and the bot
-    discord_process = multiprocessing.Process(target=bot.start)
-    web_process = multiprocessing.Process(target=web.start)
-
-    #Start Respective Process
-    discord_process.start()
-    web_process.start()
\ No newline at end of file
+    #Run the bot and web in their own processes, restarting either if it dies or stops responding
+    supervisor = Supervisor(
+        [Child('bot', run_bot), Child('web', run_web)],
+        health_port=config.supervisor_health_port,
+        heartbeat_timeout=config.supervisor_heartbeat_timeout
+    )
+    try:
+        supervisor.run()
+    finally:
+        log_listener.stop()
@@ -0,0 +1,254 @@
+import asyncio
+import collections
+import http.server
+import json
+import logging
+import multiprocessing
+import signal
+import threading
+import time
+
+'''
+Process supervisor used by start.py.
+
+The bot and web.py each run in a child process. Every child is given a Heartbeat, which it
+beats from its event loop every HEARTBEAT_INTERVAL seconds and marks ready once it is serving.
+The supervisor checks the children every second and restarts one that has exited or whose
+heartbeat has gone stale (a stuck event loop), waiting longer after each failure in a row.
+
+SIGTERM or SIGINT to the supervisor is forwarded to the children as SIGTERM so they can
+finish what they are doing; any child still running after the shutdown timeout is killed.
+
+GET /health on the health port reports each child's state, pid, restarts, heartbeat age and
+startup times, with status 200 when every child is up and 503 otherwise.
+'''
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_INTERVAL = 2 # Seconds between heartbeats sent by a child
+
+_health_server = None # Closed in each child, so a child never holds the health port
+
+class Heartbeat:
+    """ Timestamps shared between the supervisor and one child process. """
+
+    def __init__(self):
+        self._beat = multiprocessing.Value('d', 0.0, lock=False)
+        self._ready = multiprocessing.Value('d', 0.0, lock=False)
+
+    def beat(self):
+        self._beat.value = time.time()
+
+    def mark_ready(self):
+        """ Called by the child once it is serving. """
+        if not self._ready.value: self._ready.value = time.time()
+
+    def reset(self):
+        self._beat.value = 0.0
+        self._ready.value = 0.0
+
+    @property
+    def last_beat(self) -> float:
+        return self._beat.value
+
+    @property
+    def ready_at(self) -> float:
+        return self._ready.value
+
+async def beat_forever(heartbeat: Heartbeat, ready=None):
+    """ Beats from the running event loop. `ready`, if given, is polled until it returns True, then the child is marked ready. """
+    while True:
+        heartbeat.beat()
+        if ready and ready():
+            heartbeat.mark_ready()
+            ready = None
+        await asyncio.sleep(0.1 if ready else HEARTBEAT_INTERVAL)
+
+def _run_child(target, heartbeat: Heartbeat):
+    """ Entry point of a child process. """
+    # Undo the supervisor's signal handlers and health server, inherited through fork
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    if _health_server: _health_server.socket.close()
+    target(heartbeat)
+
+class Child:
+    """ One supervised process and its history. """
+
+    def __init__(self, name: str, target):
+        self.name = name
+        self.target = target # Called in the child with its Heartbeat
+        self.heartbeat = Heartbeat()
+        self.process = None
+        self.state = 'stopped' # starting, running, unresponsive, restarting or stopped
+        self.started_at = None
+        self.restarts = 0
+        self.failures = 0 # Failures in a row, for backoff
+        self.restart_at = None
+        self.last_exit_code = None
+        self.startup_seconds = collections.deque(maxlen=10) # Recent times from start to ready
+
+    def status(self) -> dict:
+        now = time.time()
+        return {
+            'state': self.state,
+            'pid': self.process.pid if self.process and self.process.is_alive() else None,
+            'restarts': self.restarts,
+            'uptime_seconds': round(now - self.started_at, 1) if self.started_at and self.state != 'restarting' else None,
+            'heartbeat_age_seconds': round(now - self.heartbeat.last_beat, 1) if self.heartbeat.last_beat else None,
+            'startup_seconds': list(self.startup_seconds),
+            'last_exit_code': self.last_exit_code,
+        }
+
+class Supervisor:
+
+    def __init__(self, children: list, health_port: int, heartbeat_timeout: float = 30, startup_timeout: float = 120,
+                 backoff_base: float = 1, backoff_max: float = 60, stable_after: float = 60, shutdown_timeout: float = 30):
+        """
+        Args:
+            children (list): Child objects to run.
+            health_port (int): Port for GET /health (0 to disable).
+            heartbeat_timeout (float): Seconds without a heartbeat before a running child is restarted.
+            startup_timeout (float): Seconds a new child has to send its first heartbeat.
+            backoff_base (float): Delay before the first restart after a failure; doubles with each failure in a row.
+            backoff_max (float): Longest delay between restarts.
+            stable_after (float): Seconds a child must run before its failures in a row are forgotten.
+            shutdown_timeout (float): Seconds children have to exit after SIGTERM before they are killed.
+        """
+        self.children = children
+        self.health_port = health_port
+        self.heartbeat_timeout = heartbeat_timeout
+        self.startup_timeout = startup_timeout
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.stable_after = stable_after
+        self.shutdown_timeout = shutdown_timeout
+
+        self._stop_signal = None
+
+    def run(self):
+        """ Starts the children and supervises them until SIGTERM or SIGINT. """
+        signal.signal(signal.SIGTERM, self._handle_signal)
+        signal.signal(signal.SIGINT, self._handle_signal)
+        if self.health_port: self._serve_health()
+
+        for child in self.children:
+            self._start(child)
+
+        while self._stop_signal is None:
+            for child in self.children:
+                self._check(child)
+            time.sleep(1)
+
+        self._shutdown()
+
+    def _handle_signal(self, signum, frame):
+        self._stop_signal = signum
+
+    # ------------------------- Children -------------------------
+
+    def _start(self, child: Child):
+        child.heartbeat.reset()
+        child.process = multiprocessing.Process(target=_run_child, args=(child.target, child.heartbeat), name=child.name)
+        child.started_at = time.time()
+        child.process.start()
+        child.restart_at = None
+        child.state = 'starting'
+        logger.info(f"Started {child.name} (pid {child.process.pid})")
+
+    def _stop(self, child: Child, timeout: float):
+        """ Asks a child to exit, killing it if it hasn't within `timeout` seconds. """
+        child.process.terminate()
+        child.process.join(timeout)
+        if child.process.is_alive():
+            logger.error(f"{child.name} did not exit within {timeout:g} seconds, killing it")
+            child.process.kill()
+            child.process.join()
+
+    def _check(self, child: Child):
+        now = time.time()
+        if child.state == 'restarting':
+            if now >= child.restart_at:
+                child.restarts += 1
+                self._start(child)
+            return
+
+        heartbeat = child.heartbeat
+        if child.state == 'starting' and heartbeat.ready_at:
+            child.startup_seconds.append(round(heartbeat.ready_at - child.started_at, 2))
+            child.state = 'running'
+            logger.info(f"{child.name} ready in {child.startup_seconds[-1]:.1f} seconds")
+
+        if not child.process.is_alive():
+            child.last_exit_code = child.process.exitcode
+            self._schedule_restart(child, f"exited with code {child.last_exit_code}")
+            return
+
+        # A child that has stopped beating has a stuck event loop
+        if heartbeat.last_beat:
+            stale = now - heartbeat.last_beat > self.heartbeat_timeout
+        else:
+            stale = now - child.started_at > self.startup_timeout
+        if stale:
+            child.state = 'unresponsive'
+            logger.error(f"{child.name} (pid {child.process.pid}) has not sent a heartbeat in {self.heartbeat_timeout:g} seconds")
+            self._stop(child, min(self.shutdown_timeout, 10))
+            child.last_exit_code = child.process.exitcode
+            self._schedule_restart(child, "was unresponsive")
+
+    def _schedule_restart(self, child: Child, reason: str):
+        if time.time() - child.started_at > self.stable_after:
+            child.failures = 0
+        delay = min(self.backoff_base * 2 ** child.failures, self.backoff_max)
+        child.failures += 1
+        child.state = 'restarting'
+        child.restart_at = time.time() + delay
+        logger.error(f"{child.name} {reason}, restarting in {delay:g} seconds")
+
+    def _shutdown(self):
+        logger.info(f"Received {signal.Signals(self._stop_signal).name}, stopping {', '.join(child.name for child in self.children)}")
+        running = [child for child in self.children if child.process and child.process.is_alive()]
+        for child in running:
+            child.process.terminate()
+
+        deadline = time.monotonic() + self.shutdown_timeout
+        for child in running:
+            child.process.join(max(deadline - time.monotonic(), 0))
+            if child.process.is_alive():
+                logger.error(f"{child.name} did not exit within {self.shutdown_timeout:g} seconds, killing it")
+                child.process.kill()
+                child.process.join()
+            child.state = 'stopped'
+            child.last_exit_code = child.process.exitcode
+        logger.info("All processes stopped")
+
+    # ------------------------- Health -------------------------
+
+    def status(self) -> tuple:
+        """ Returns (whether every child is running, status of each child by name). """
+        statuses = {child.name: child.status() for child in self.children}
+        return all(child.state == 'running' for child in self.children), statuses
+
+    def _serve_health(self):
+        global _health_server
+        supervisor = self
+
+        class HealthHandler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != '/health':
+                    self.send_error(404)
+                    return
+                healthy, statuses = supervisor.status()
+                body = json.dumps({'healthy': healthy, 'processes': statuses}).encode()
+                self.send_response(200 if healthy else 503)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass # Polled constantly; not worth logging
+
+        _health_server = http.server.ThreadingHTTPServer(('0.0.0.0', self.health_port), HealthHandler)
+        threading.Thread(target=_health_server.serve_forever, name="health", daemon=True).start()
+        logger.info(f"Health endpoint on port {self.health_port}")
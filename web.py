@@ -1,26 +1,24 @@
 import records
 import config
+import metrics
+import log_setup
+from spool import RegistrationSpool
+from supervisor import HEARTBEAT_INTERVAL, beat_forever
 
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, g
 from eventlet import wsgi
 import eventlet
 
+import asyncio
+import hashlib
+import json
 import logging
+import signal
+import threading
+import time
 
+# Logs go to web.log and the console through a queue (see log_setup.py, set up in start())
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.INFO) 
-formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-
-# Logs everything of INFO level and above to a file
-file_handler = logging.FileHandler('web.log')
-file_handler.setFormatter(formatter)
-logger.addHandler(file_handler)
-
-# Logs only WARNING level and above to the console
-console_handler = logging.StreamHandler()
-console_handler.setLevel(logging.WARNING)
-console_handler.setFormatter(formatter)
-logger.addHandler(console_handler)
 
 '''
 The purpose of this file is to stay active and listen for any incoming post requests from 
@@ -42,89 +40,336 @@ Format for Post Requests JSON
         'roles': (role,role), (comma-separated)        
     }
 }
+
+"/post/users" takes many registrants in one request, either as a JSON array of the bodies
+above or as NDJSON (Content-Type: application/x-ndjson, one body per line). Every valid row
+is written in a single transaction, and the response has a result for each row:
+{
+    'added': int,
+    'failed': int,
+    'results': [{'row': int, 'email': str, 'status': 'ok'}, {'row': int, 'status': 'error', 'error': str}, ...]
+}
+
+Read-only endpoints for dashboards (GET, same Api-Key header):
+    /api/teams?after=<team id>&limit=<n>  active teams in ID order with member counts, and 'next'
+                                          (the `after` for the next page, or null on the last page)
+    /api/teams/<team id>/members          members of one team
+    /api/stats                            registration and verification counts
+Responses carry an ETag that changes whenever the registration, verified or team tables do.
+Send it back in If-None-Match and you get 304 Not Modified after a single one-row lookup, without
+the teams or registrations being read.
 '''
 
+# Qualtrics volunteer form role numbers
+ROLE_MAP = {
+    '1': 'judge',
+    '2': 'mentor'
+}
+
+MAX_BATCH_ROWS = 10000
+SPOOL_FILE = 'registrations.spool'
+ASGI_WORKER_THREADS = 10 # Requests handled at once in ASGI mode
+API_PAGE_SIZE = 100
+API_MAX_PAGE_SIZE = 500
+API_CACHE_SIZE = 1000 # Response bodies kept for the current data version
+
 #Define the server as app
 app = Flask(__name__)
 
+web_metrics = metrics.Registry()
+request_duration = web_metrics.histogram("web_request_duration_seconds", "Time spent handling an HTTP request", ("endpoint", "status"))
+
+# With spool enabled in config.ini, /post/user answers 202 once a registration is spooled
+registration_spool = RegistrationSpool(SPOOL_FILE) if config.web_spool else None
+if registration_spool:
+    web_metrics.gauge("web_spool_depth", "Registrations spooled but not yet written to the database", registration_spool.depth)
+    web_metrics.gauge("web_spool_lag_seconds", "Age of the oldest registration waiting in the spool", registration_spool.lag)
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_time(response):
+    request_duration.observe(time.perf_counter() - g.request_start, request.endpoint or "unknown", str(response.status_code))
+    return response
+
+#Serve web and bot metrics in the Prometheus text format
+@app.route("/metrics", methods=['GET'])
+def get_metrics():
+    body = web_metrics.render() + metrics.read_textfile(metrics.BOT_METRICS_FILE)
+    return body, 200, {'Content-Type': 'text/plain; version=0.0.4'}
+
+def has_valid_api_key() -> bool:
+    return request.headers.get('Api-Key') == config.web_api_key
+
+def parse_registration(data) -> tuple:
+    """
+    Validates one registrant from a request body.
+
+    Returns:
+        tuple: (registration, None) where registration is (email, first_name, last_name, is_capstone, roles)
+               as taken by records.add_registration(), or (None, error message) if the data is invalid.
+    """
+    if not isinstance(data, dict):
+        return None, "Each registrant must be a JSON object"
+
+    # Email is required, and must be a string
+    email = data.get("email")
+    email = records.normalize_email(email) if isinstance(email, str) else ""
+    if not email:
+        return None, "Email is required"
+
+    # Names are optional, but must be strings if given
+    first_name, last_name = data.get("firstName"), data.get("lastName")
+    if not all(name is None or isinstance(name, str) for name in (first_name, last_name)):
+        return None, "First and last name must be strings"
+
+    if data.get("isAdultOrOSU") == 2:
+        return None, "Participant not allowed"
+
+    # Split the roles input into individual role numbers (by comma) and keep the valid ones
+    roles = []
+    for role in str(data.get("roles", "")).split(','):
+        role = role.strip()
+        if role in ROLE_MAP and ROLE_MAP[role] not in roles:
+            roles.append(ROLE_MAP[role])
+
+    # If there is no roles at this point, it is because they're a participant
+    if len(roles) == 0:
+        roles.append('participant')
+
+    is_capstone = str(data.get("is_capstone", data.get("classTeam", ""))).strip().lower() in ('yes', 'true', '1')
+    return (email, first_name, last_name, is_capstone, roles), None
+
+def registration_digest(registration: tuple) -> str:
+    """ Hashes everything a registration would write, so deliveries that change nothing get the same digest. """
+    return hashlib.sha256(json.dumps(registration, sort_keys=True).encode()).hexdigest()
+
 #Setup a method to listen at "/post/user" for a post request
 @app.route("/post/user", methods=['POST'])
 def push_user():
     #Check that API key is correct
-    if (request.headers.get('Api-Key') == config.web_api_key):
-       
-        ROLE_MAP = {
-            '1': 'judge',
-            '2': 'mentor'
-        }
-        
-        #Retrieve Data from Request
-        data = request.get_json()
-        
-        # Email is required
-        email = data.get("email", "").lower()
-
-        if not email:
-            logging.error("Email is required.")
-            return jsonify({"error": "Email is required"}), 400
-
-        if data.get("isAdultOrOSU") == 2:
-            logging.error("Participant not allowed.")
-            return jsonify({"error": "Participant not allowed"}), 400
-
-        # Get the 'roles' data from the input, defaulting to an empty string if not found
-        roles_input = data.get("roles", "")
-
-        # Initialize an empty list to store the roles
-        roles = []
-
-        # If role_input is not empty, process the roles
-        if roles_input:
-            # Split the input into individual role strings (by comma), and process each one
-            for role in roles_input.split(','):
-                role = role.strip()  # Clean up any extra spaces around the role
-                if role in ROLE_MAP and (role not in roles):  # Only consider valid roles
-                    roles.append(ROLE_MAP.get(role))  # Add the corresponding role name to the list        
-        
-        # If there is no roles at this point, it is because they're a participant
-        if len(roles) == 0:
-            roles.append('participant')
-        
-        user_data = {
-            # Data fields for both forms
-            "first_name": data.get("firstName"),
-            "last_name": data.get("lastName"),
-
-            # Data fields specific to the participant form
-            "university": data.get("university"),
-            "class_team": data.get("classTeam"),
-            "major": data.get("major"),
-            "grad_year": data.get("gradYear"),
-
-            # Data fields specific to the judges/mentors form
-            "company": data.get("company"),
-            "job_title": data.get("jobTitle"),
-        }
-        
-        #Append Data to Database 
+    if not has_valid_api_key():
+        logger.error("Api-Key is not correct.")
+        return jsonify({"error": "Api-Key is not correct."}), 401
+
+    registration, error = parse_registration(request.get_json(silent=True))
+    if error:
+        logger.error(error)
+        return jsonify({"error": error}), 400
+    email, first_name, last_name, is_capstone, roles = registration
+
+    # Qualtrics retries deliveries, so answer one that changes nothing with the earlier response
+    digest = registration_digest(registration)
+    try:
+        earlier_response = records.get_webhook_response(email, digest)
+    except Exception as e:
+        logger.exception(f"Could not check the webhook ledger for {email}: {e}")
+        return jsonify({"error": "An internal server error occurred."}), 500
+    if earlier_response:
+        logger.info("Repeat delivery, nothing to update", extra={'sample': True, 'fields': {'email': email}})
+        return earlier_response, 201, {'Content-Type': 'application/json', 'Idempotent-Replay': 'true'}
+
+    response = json.dumps({"email": email, "first_name": first_name, "last_name": last_name, "is_capstone": is_capstone, "roles": roles})
+
+    # Spool the registration for the drain thread to write, or write it now
+    if registration_spool:
         try:
-            #Add User to registrant list
-            records.add_registered_user(email, roles, user_data)
-
-            #Send back "Good" Message
-            logging.info(f"User registered successfully: {email} with roles {roles}")
-            return jsonify({"email": email, "roles": roles, "data": user_data}), 201
-        except Exception as e:
-            #Send Error that user being added has failed
-            logging.exception(f"An unexpected error occured: {e}")
+            if not registration_spool.is_pending(email, digest):
+                registration_spool.append(registration, digest, response)
+            logger.info("User registration spooled", extra={'sample': True, 'fields': {'email': email, 'roles': roles}})
+            return response, 202, {'Content-Type': 'application/json'}
+        except ValueError as e:
+            logger.error(f"Refused to spool registration for {email}: {e}")
+            return jsonify({"error": str(e)}), 400
+        except OSError as e:
+            logger.exception(f"Could not spool registration for {email}: {e}")
             return jsonify({"error": "An internal server error occurred."}), 500
-    else:
-        #Send Error that Api-Key is not correct
-        logging.error("Api-Key is not correct.")
+
+    #Append Data to Database 
+    try:
+        records.add_webhook_registration(registration, digest, response)
+
+        #Send back "Good" Message
+        logger.info("User registered successfully", extra={'sample': True, 'fields': {'email': email, 'roles': roles}})
+        return response, 201, {'Content-Type': 'application/json'}
+    except Exception as e:
+        #Send Error that user being added has failed
+        logger.exception(f"An unexpected error occured: {e}")
+        return jsonify({"error": "An internal server error occurred."}), 500
+
+def read_batch() -> list:
+    """
+    Returns the rows of a batch request body: decoded JSON values, or exceptions for NDJSON
+    lines that aren't valid JSON. Raises ValueError if the body isn't a JSON array or NDJSON.
+    """
+    if request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+        rows = []
+        for line in request.stream:
+            if not line.strip(): continue
+            try:
+                rows.append(json.loads(line))
+            except ValueError as e:
+                rows.append(e)
+            if len(rows) > MAX_BATCH_ROWS: break
+        return rows
+
+    rows = request.get_json(silent=True)
+    if not isinstance(rows, list):
+        raise ValueError("Body must be a JSON array, or NDJSON with Content-Type application/x-ndjson")
+    return rows
+
+#Listen at "/post/users" for many registrants at once
+@app.route("/post/users", methods=['POST'])
+def push_users():
+    if not has_valid_api_key():
+        logger.error("Api-Key is not correct.")
         return jsonify({"error": "Api-Key is not correct."}), 401
 
-# Method to start a server and wait for a request
-def start():
-    wsgi.server(eventlet.listen(('0.0.0.0', config.web_port)), app)
+    try:
+        rows = read_batch()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if len(rows) > MAX_BATCH_ROWS:
+        return jsonify({"error": f"A batch can have at most {MAX_BATCH_ROWS} rows"}), 413
+
+    # Validate every row, then write the valid ones together
+    results = []
+    registrations = []
+    for row_num, row in enumerate(rows):
+        registration, error = (None, f"Invalid JSON: {row}") if isinstance(row, Exception) else parse_registration(row)
+        if error:
+            results.append({"row": row_num, "status": "error", "error": error})
+        else:
+            results.append({"row": row_num, "email": registration[0], "status": "ok"})
+            registrations.append(registration)
+
+    try:
+        records.add_registrations(registrations)
+    except Exception as e:
+        logger.exception(f"An unexpected error occured while adding a batch of {len(registrations)} users: {e}")
+        return jsonify({"error": "An internal server error occurred."}), 500
+
+    failed = len(results) - len(registrations)
+    logger.info(f"Batch registered {len(registrations)} users ({failed} rows rejected)")
+    return jsonify({"added": len(registrations), "failed": failed, "results": results}), 200
+
+# ------------------------- Read API --------------------------
+
+# request path -> JSON body for the data version in api_cache_version, emptied when it changes.
+# Shared by the request threads in ASGI mode, so only used under api_cache_lock.
+api_cache = {}
+api_cache_version = None
+api_cache_lock = threading.Lock()
+
+def cached_api_response(build):
+    """
+    Answers a read API request from the data version: 304 if the client's ETag is current,
+    otherwise the body built by `build()`, reused for identical requests until the data changes.
+    """
+    if not has_valid_api_key():
+        logger.error("Api-Key is not correct.")
+        return jsonify({"error": "Api-Key is not correct."}), 401
+
+    version = records.get_data_version()
+    headers = {'ETag': f'"{version}"', 'Cache-Control': 'no-cache'}
+    if request.if_none_match.contains_weak(str(version)):
+        return "", 304, headers
+
+    with api_cache_lock:
+        body = api_cache.get(request.full_path) if api_cache_version == version else None
+    if body is None:
+        body, status = build()
+        if status != 200:
+            return body, status, {'Content-Type': 'application/json'}
+        cache_api_response(version, request.full_path, body)
+    return body, 200, {**headers, 'Content-Type': 'application/json'}
+
+def cache_api_response(version: int, path: str, body: str):
+    global api_cache_version
+    with api_cache_lock:
+        # A request that read an older version than another thread has cached is not kept
+        if api_cache_version is not None and version < api_cache_version: return
+        if version != api_cache_version or len(api_cache) >= API_CACHE_SIZE:
+            api_cache.clear()
+            api_cache_version = version
+        api_cache[path] = body
+
+@app.route("/api/teams", methods=['GET'])
+def api_teams():
+    def build():
+        try:
+            after = int(request.args.get('after', 0))
+            limit = min(max(int(request.args.get('limit', API_PAGE_SIZE)), 1), API_MAX_PAGE_SIZE)
+        except ValueError:
+            return json.dumps({"error": "after and limit must be integers"}), 400
+        teams = records.get_teams_page(after, limit)
+        next_after = teams[-1]['id'] if len(teams) == limit else None
+        return json.dumps({"teams": teams, "next": next_after}), 200
+    return cached_api_response(build)
+
+@app.route("/api/teams/<int:team_id>/members", methods=['GET'])
+def api_team_members(team_id: int):
+    def build():
+        team = records.get_team(team_id)
+        if not team or team['status'] != 'active':
+            return json.dumps({"error": "Team not found"}), 404
+        return json.dumps({"team_id": team_id, "name": team['name'], "members": records.get_team_members(team_id)}), 200
+    return cached_api_response(build)
+
+@app.route("/api/stats", methods=['GET'])
+def api_stats():
+    def build():
+        return json.dumps({"registrations": records.get_registration_counts(), "verifications": records.get_verification_counts()}), 200
+    return cached_api_response(build)
+
+def create_asgi_app():
+    """
+    Wraps the Flask app for an ASGI server. Each request runs on one of ASGI_WORKER_THREADS
+    threads, so the blocking database calls in records.py stay off the event loop.
+    """
+    from a2wsgi import WSGIMiddleware
+    return WSGIMiddleware(app, workers=ASGI_WORKER_THREADS)
+
+async def serve_asgi(heartbeat=None):
+    """ Runs uvicorn, which finishes in-flight requests and exits on SIGTERM. """
+    import uvicorn
+    server = uvicorn.Server(uvicorn.Config(create_asgi_app(), host='0.0.0.0', port=config.web_port, log_level='warning'))
+    if heartbeat:
+        asyncio.create_task(beat_forever(heartbeat, ready=lambda: server.started))
+    await server.serve()
+
+def stop_eventlet(signum, frame):
+    # eventlet's server stops accepting and waits for in-flight requests on SystemExit
+    raise SystemExit(0)
+
+# Method to start a server and wait for a request, using the server chosen in config.ini.
+# `heartbeat` is given when run under start.py's supervisor.
+def start(heartbeat=None):
+    log_listener = log_setup.setup_logging('web.log')
+    try:
+        if registration_spool:
+            registration_spool.start()
+
+        if config.web_server == 'asgi':
+            asyncio.run(serve_asgi(heartbeat))
+        else:
+            server_socket = eventlet.listen(('0.0.0.0', config.web_port))
+            signal.signal(signal.SIGTERM, stop_eventlet)
+            if heartbeat:
+                heartbeat.mark_ready()
+                def beat_forever_eventlet():
+                    while True:
+                        heartbeat.beat()
+                        eventlet.sleep(HEARTBEAT_INTERVAL)
+                eventlet.spawn(beat_forever_eventlet)
+            wsgi.server(server_socket, app)
+    except Exception as e:
+        logger.critical(f"Web server stopped: {e!r}", exc_info=True)
+        raise
+    finally:
+        # Write out everything still queued; multiprocessing children skip atexit
+        log_listener.stop()
 
 
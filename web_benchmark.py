@@ -0,0 +1,114 @@
+"""
+Compares the two web.py servers (eventlet WSGI and uvicorn ASGI) on `/post/user`.
+
+Each server is started in its own process against a throwaway copy of the database, then
+hammered by concurrent clients posting new registrations for a fixed time. Reports
+requests/second and latency percentiles for each.
+
+USAGE: web_benchmark.py [--concurrency N] [--duration SECONDS] [--servers eventlet,asgi]
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import socket
+import statistics
+import tempfile
+import time
+
+import aiohttp
+
+import config
+
+# ------------------------- Servers ---------------------------
+
+def serve(server: str, port: int, database_file: str):
+    """ Runs web.py with the given server. Target of the server process. """
+    # records.py opens its database as soon as it is imported, so the path has to be set before web.py imports it
+    os.environ['RECORDS_DB'] = database_file
+    config.web_server = server
+    config.web_port = port
+
+    # Keep per-request access logs out of the results
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    os.dup2(devnull, 2)
+
+    import web
+    web.start()
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+async def wait_until_up(session: aiohttp.ClientSession, url: str, timeout: float = 15):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            async with session.get(f"{url}/metrics") as response:
+                if response.status == 200: return
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(0.1)
+    raise RuntimeError(f"Server at {url} did not start within {timeout} seconds")
+
+# ------------------------- Harness ---------------------------
+
+async def client(session: aiohttp.ClientSession, url: str, client_num: int, stop_at: float, results: dict):
+    request_num = 0
+    while time.perf_counter() < stop_at:
+        body = {"email": f"bench{client_num}-{request_num}@example.com", "firstName": "Bench", "lastName": f"Mark{request_num}", "roles": ""}
+        start = time.perf_counter()
+        try:
+            async with session.post(f"{url}/post/user", json=body, headers={'Api-Key': config.web_api_key}) as response:
+                await response.read()
+                ok = response.status == 201
+        except aiohttp.ClientError:
+            ok = False
+        results['latency'].append(time.perf_counter() - start)
+        if not ok: results['errors'] += 1
+        request_num += 1
+
+async def run(url: str, concurrency: int, duration: float) -> dict:
+    results = {'latency': [], 'errors': 0}
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        await wait_until_up(session, url)
+        start = time.perf_counter()
+        await asyncio.gather(*(client(session, url, client_num, start + duration, results) for client_num in range(concurrency)))
+        results['elapsed'] = time.perf_counter() - start
+    return results
+
+def benchmark(server: str, concurrency: int, duration: float) -> dict:
+    with tempfile.TemporaryDirectory() as temp_dir:
+        port = free_port()
+        process = multiprocessing.Process(target=serve, args=(server, port, os.path.join(temp_dir, 'benchmark.db')), daemon=True)
+        process.start()
+        try:
+            return asyncio.run(run(f"http://127.0.0.1:{port}", concurrency, duration))
+        finally:
+            process.terminate()
+            process.join()
+
+def percentile(values: list, pct: int) -> float:
+    if len(values) < 2: return values[0] if values else float('nan')
+    return statistics.quantiles(values, n=100, method='inclusive')[pct - 1]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark web.py's eventlet and ASGI servers on /post/user.")
+    parser.add_argument('--concurrency', type=int, default=50, help="number of concurrent clients (default: 50)")
+    parser.add_argument('--duration', type=float, default=10, help="seconds to run each server for (default: 10)")
+    parser.add_argument('--servers', default='eventlet,asgi', help="comma-separated servers to test (default: eventlet,asgi)")
+    args = parser.parse_args()
+
+    for server in args.servers.split(','):
+        print(f'Benchmarking {server} with {args.concurrency} clients for {args.duration:g} seconds, please wait...')
+        results = benchmark(server, args.concurrency, args.duration)
+        latency = results['latency']
+        print(f'{server:>9}: {len(latency) / results["elapsed"]:.0f} requests/second, '
+              f'p50 {percentile(latency, 50) * 1000:.1f} ms, p99 {percentile(latency, 99) * 1000:.1f} ms, '
+              f'{results["errors"]} errors out of {len(latency)} requests')
+
+if __name__ == "__main__":
+    main()